@@ -1,4 +1,5 @@
 import os
+import re
 import discord
 import logging
 
@@ -30,6 +31,42 @@ agent = MistralAgent()
 # Get the token from the environment variables
 token = os.getenv("DISCORD_TOKEN")
 
+# Matches prices such as "4.99" or "$4.99"
+_PRICE_RE = re.compile(r'\$?(\d+(?:\.\d{1,2})?)')
+
+
+def _parse_price_cents(price):
+    """Convert a menu price into integer cents, or return None if it is malformed"""
+    if isinstance(price, (int, float)):
+        return int(round(price * 100))
+    match = _PRICE_RE.fullmatch(str(price).strip())
+    if not match:
+        return None
+    return int(round(float(match.group(1)) * 100))
+
+
+# Sent instead of checking out when a cart item's price can't be read
+INVALID_PRICE_MESSAGE = "Sorry, {name} has an invalid price. Please remove it from your cart before checking out."
+
+
+def _item_price_cents(item):
+    """Get a cart item's price in cents, or None if it is malformed
+    
+    Carts saved before items carried price_cents only have the menu price, so it is parsed here
+    """
+    price_cents = item.get('price_cents')
+    if price_cents is None:
+        price_cents = _parse_price_cents(item.get('price'))
+    return price_cents
+
+
+def _invalid_price_item(cart):
+    """Get the first cart item whose price can't be read, or None"""
+    for item in cart:
+        if _item_price_cents(item) is None:
+            return item
+    return None
+
 
 @bot.event
 async def on_ready():
@@ -492,8 +529,16 @@ async def display_cart(ctx, user_id, view=None):
     
     total = 0
     for index, item in enumerate(cart, 1):
-        item_price = float(item['price'].replace('$', ''))
         item_quantity = item.get('quantity', 1)
+        price_cents = _item_price_cents(item)
+        if price_cents is None:
+            embed.add_field(
+                name=f"{index}. {item['name']} (x{item_quantity})",
+                value="Invalid price - please remove this item",
+                inline=False
+            )
+            continue
+        item_price = price_cents / 100
         item_total = item_price * item_quantity
         total += item_total
         
@@ -671,10 +716,17 @@ class RestaurantMenuView(discord.ui.View):
         selected_idx = int(interaction.data['values'][0])
         selected_item = self.menu[selected_idx]
         
+        # Parse the price once here so checkout never has to
+        price_cents = _parse_price_cents(selected_item['price'])
+        if price_cents is None:
+            await interaction.response.send_message(f"Sorry, {selected_item['name']} has an invalid price and can't be added.", ephemeral=True)
+            return
+        
         # Add item to cart
         item_with_qty = {
             "name": selected_item['name'],
             "price": selected_item['price'],
+            "price_cents": price_cents,
             "quantity": 1
         }
         
@@ -706,11 +758,20 @@ class RestaurantMenuView(discord.ui.View):
         
         total = 0
         for item in self.cart:
-            item_total = item["price"].replace('$', '') * item["quantity"]
+            price_cents = _item_price_cents(item)
+            if price_cents is None:
+                embed.add_field(
+                    name=f"{item['quantity']}x {item['name']}",
+                    value="Invalid price - please remove this item",
+                    inline=False
+                )
+                continue
+            item_price = price_cents / 100
+            item_total = item_price * item["quantity"]
             total += item_total
             embed.add_field(
                 name=f"{item['quantity']}x {item['name']}",
-                value=f"${item_total:.2f} (${item['price']} each)",
+                value=f"${item_total:.2f} (${item_price:.2f} each)",
                 inline=False
             )
         
@@ -734,6 +795,11 @@ class RestaurantMenuView(discord.ui.View):
             await interaction.response.send_message("Your cart is empty! Add some items first.", ephemeral=True)
             return
         
+        invalid_item = _invalid_price_item(self.cart)
+        if invalid_item:
+            await interaction.response.send_message(INVALID_PRICE_MESSAGE.format(name=invalid_item['name']), ephemeral=True)
+            return
+        
         # Get user data to check address
         user_data = self.agent._get_user_data(self.user_id)
         
@@ -743,7 +809,7 @@ class RestaurantMenuView(discord.ui.View):
             await interaction.response.send_modal(modal)
         else:
             # Show confirmation view
-            total = sum(item["price"].replace('$', '') * item["quantity"] for item in self.cart)
+            total = sum(_item_price_cents(item) * item["quantity"] for item in self.cart) / 100
             
             embed = discord.Embed(
                 title="Order Confirmation",
@@ -805,6 +871,11 @@ class CartActionView(discord.ui.View):
             await interaction.response.send_message("This cart is not yours!", ephemeral=True)
             return
         
+        invalid_item = _invalid_price_item(self.cart)
+        if invalid_item:
+            await interaction.response.send_message(INVALID_PRICE_MESSAGE.format(name=invalid_item['name']), ephemeral=True)
+            return
+        
         # Get user data to check address
         user_data = self.agent._get_user_data(self.user_id)
         
@@ -814,7 +885,7 @@ class CartActionView(discord.ui.View):
             await interaction.response.send_modal(modal)
         else:
             # Show confirmation view
-            total = sum(item["price"].replace('$', '') * item["quantity"] for item in self.cart)
+            total = sum(_item_price_cents(item) * item["quantity"] for item in self.cart) / 100
             
             embed = discord.Embed(
                 title="Order Confirmation",
@@ -860,8 +931,13 @@ class AddressModal(discord.ui.Modal, title="Enter Delivery Address"):
         user_data["address"] = self.address.value
         self.agent._save_user_data()
         
+        invalid_item = _invalid_price_item(self.cart)
+        if invalid_item:
+            await interaction.response.send_message(INVALID_PRICE_MESSAGE.format(name=invalid_item['name']), ephemeral=True)
+            return
+        
         # Show confirmation view
-        total = sum(item["price"].replace('$', '') * item["quantity"] for item in self.cart)
+        total = sum(_item_price_cents(item) * item["quantity"] for item in self.cart) / 100
         
         embed = discord.Embed(
             title="Order Confirmation",
@@ -1513,6 +1589,11 @@ class CartView(discord.ui.View):
         
         user_data = self.agent._get_user_data(self.user_id)
         
+        invalid_item = _invalid_price_item(user_data.get('cart', []))
+        if invalid_item:
+            await interaction.response.send_message(INVALID_PRICE_MESSAGE.format(name=invalid_item['name']), ephemeral=True)
+            return
+        
         # Check if address is set
         if not user_data.get('address'):
             # Show address modal
@@ -1583,8 +1664,10 @@ class UpdateCartQuantitiesModal(discord.ui.Modal, title="Update Cart Quantities"
         # Create a text input for each item (up to 5, which is the max for modals)
         self.item_inputs = []
         for i, item in enumerate(cart[:5]):  # Discord modals can only have 5 inputs max
+            price_cents = _item_price_cents(item)
+            price_text = f"${price_cents / 100:.2f}" if price_cents is not None else "invalid price"
             item_input = TextInput(
-                label=f"{item['name']} (${float(item['price'].replace('$', '')):.2f})",
+                label=f"{item['name']} ({price_text})",
                 placeholder="Enter quantity (0 to remove)",
                 default=str(item.get('quantity', 1)),
                 required=True,
@@ -1673,12 +1756,6 @@ class CheckoutModal(discord.ui.Modal, title="Complete Your Order"):
         if not cart:
             return
         
-        # Calculate total
-        total = sum(float(item['price'].replace('$', '')) * item.get('quantity', 1) for item in cart)
-        delivery_fee = 3.99
-        tax = total * 0.07
-        grand_total = total + delivery_fee + tax
-        
         # Create inputs for payment and special instructions
         self.payment_method = Select(
             placeholder="Select payment method",
@@ -1706,6 +1783,12 @@ class CheckoutModal(discord.ui.Modal, title="Complete Your Order"):
         user_data = self.agent._get_user_data(self.user_id)
         cart = user_data.get('cart', [])
         
+        # Never place an order with an item priced as nothing
+        invalid_item = _invalid_price_item(cart)
+        if invalid_item:
+            await interaction.response.send_message(INVALID_PRICE_MESSAGE.format(name=invalid_item['name']), ephemeral=True)
+            return
+        
         # Create a nice embed for the order confirmation
         embed = discord.Embed(
             title="🎉 Order Confirmed!",
@@ -1713,14 +1796,24 @@ class CheckoutModal(discord.ui.Modal, title="Complete Your Order"):
             color=discord.Color.green()
         )
         
-        # Calculate the total
-        total = sum(float(item['price'].replace('$', '')) * item.get('quantity', 1) for item in cart)
+        # Build the item lines, order history items and total in a single pass over the cart
+        item_lines = []
+        history_items = []
+        total_cents = 0
+        for item in cart:
+            quantity = item.get('quantity', 1)
+            line_cents = _item_price_cents(item) * quantity
+            total_cents += line_cents
+            item_lines.append(f"• {quantity}x {item['name']} - ${line_cents / 100:.2f}")
+            history_items.append({'name': item['name'], 'quantity': quantity, 'price': item['price']})
+        
+        total = total_cents / 100
         delivery_fee = 3.99
         tax = total * 0.07
         grand_total = total + delivery_fee + tax
         
         # Add order details
-        items_text = "\n".join([f"• {item.get('quantity', 1)}x {item['name']} - ${float(item['price'].replace('$', '')) * item.get('quantity', 1):.2f}" for item in cart])
+        items_text = "\n".join(item_lines)
         
         embed.add_field(
             name="Order Items",
@@ -1793,7 +1886,7 @@ class CheckoutModal(discord.ui.Modal, title="Complete Your Order"):
         user_data['order_history'].append({
             'order_number': order_number,
             'restaurant': cart[0]['restaurant'],
-            'items': [{'name': item['name'], 'quantity': item.get('quantity', 1), 'price': item['price']} for item in cart],
+            'items': history_items,
             'total': grand_total,
             'address': user_data.get('address', ''),
             'payment_method': self.payment_method.values[0],
@@ -1,12 +1,238 @@
 import os
 import json
+import asyncio
 import aiohttp
 import logging
+import pickle
 import random
+import re
+import threading
+import time
+from pathlib import Path
 from dotenv import load_dotenv
 
+try:
+    # orjson parses API responses considerably faster when it is installed
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
 logger = logging.getLogger("delivery_api")
 
+# Load environment variables once at import rather than per client
+load_dotenv()
+
+
+def _grams(item, nutrient):
+    """Return a macro in grams, using the numeric field when the item has one."""
+    grams = item.get(f"{nutrient}_g")
+    if grams is None:
+        grams = int(str(item.get(nutrient, "0g")).replace("g", "") or 0)
+    return grams
+
+
+# Menu item filters for each health goal
+_HEALTH_CRITERIA = {
+    "weight loss": lambda item: int(item.get("calories", 1000)) < 500,
+    "muscle gain": lambda item: _grams(item, "protein") > 25,
+    "energy": lambda item: _grams(item, "carbs") > 30,
+    "general health": lambda item: any(tag in ("healthy", "balanced", "organic") for tag in item.get("tags", []))
+}
+
+
+class Restaurant:
+    """A mock restaurant record. Slotted to keep the 1000+ generated restaurants compact."""
+    
+    __slots__ = ("id", "name", "rating", "delivery_fee", "estimated_time", "cuisine", "tags", "location", "image_url",
+                 "cuisine_lc", "tags_lc", "tags_joined")
+    
+    def __init__(self, id, name, rating, delivery_fee, estimated_time, cuisine, tags, location=None, image_url=None):
+        self.id = id
+        self.name = name
+        self.rating = rating
+        self.delivery_fee = delivery_fee
+        self.estimated_time = estimated_time
+        self.cuisine = cuisine
+        self.tags = tags
+        self.location = location
+        self.image_url = image_url
+        
+        # Lowercased copies for the search filters, computed once instead of per search
+        self.cuisine_lc = cuisine.lower()
+        self.tags_lc = frozenset(tag.lower() for tag in tags)
+        self.tags_joined = " ".join(tag.lower() for tag in tags)
+    
+    def to_dict(self):
+        """Return the restaurant as a plain dict for callers and JSON storage."""
+        return {
+            "id": self.id,
+            "name": self.name,
+            "rating": self.rating,
+            "delivery_fee": self.delivery_fee,
+            "estimated_time": self.estimated_time,
+            "cuisine": self.cuisine,
+            "tags": list(self.tags),
+            "location": self.location,
+            "image_url": self.image_url
+        }
+
+
+class MenuItem:
+    """A mock menu item record. Macros are stored as whole grams."""
+    
+    __slots__ = ("id", "name", "price", "description", "calories", "protein_g", "carbs_g", "fat_g", "tags", "image_url")
+    
+    def __init__(self, id, name, price, description, calories, protein_g, carbs_g, fat_g, tags, image_url=None):
+        self.id = id
+        self.name = name
+        self.price = price
+        self.description = description
+        self.calories = calories
+        self.protein_g = protein_g
+        self.carbs_g = carbs_g
+        self.fat_g = fat_g
+        self.tags = tags
+        self.image_url = image_url
+    
+    def to_dict(self):
+        """Return the menu item as a plain dict for callers and JSON storage."""
+        return {
+            "id": self.id,
+            "name": self.name,
+            "price": self.price,
+            "description": self.description,
+            "calories": self.calories,
+            "protein": f"{self.protein_g}g",
+            "carbs": f"{self.carbs_g}g",
+            "fat": f"{self.fat_g}g",
+            "protein_g": self.protein_g,
+            "carbs_g": self.carbs_g,
+            "fat_g": self.fat_g,
+            "tags": list(self.tags),
+            "image_url": self.image_url
+        }
+
+
+class LazyMenus(dict):
+    """
+    Mapping of restaurant ID to mock menu items.
+    
+    Menus are generated on first access rather than up front, since only a handful of the
+    1000+ mock restaurants are ever viewed. Each menu is seeded from its restaurant ID, so the
+    same restaurant always gets the same menu.
+    """
+    
+    # Menu item components
+    protein_options = [
+        "Grilled Chicken", "Wild Salmon", "Grass-Fed Beef", "Tofu", "Tempeh", 
+        "Quinoa", "Lentils", "Black Beans", "Chickpeas", "Tuna", "Turkey", 
+        "Plant Protein", "Seitan", "Egg Whites", "Greek Yogurt"
+    ]
+    
+    base_options = [
+        "Brown Rice", "Quinoa", "Mixed Greens", "Spinach", "Kale", "Sweet Potato",
+        "Whole Grain Wrap", "Cauliflower Rice", "Ancient Grains", "Zucchini Noodles",
+        "Buckwheat", "Black Rice", "Farro", "Sprouted Grain"
+    ]
+    
+    veggie_options = [
+        "Roasted Vegetables", "Steamed Broccoli", "Sautéed Kale", "Bell Peppers",
+        "Cherry Tomatoes", "Cucumber", "Carrots", "Avocado", "Red Onion", "Mushrooms",
+        "Asparagus", "Brussels Sprouts", "Cauliflower", "Green Beans", "Snap Peas"
+    ]
+    
+    sauce_options = [
+        "Tahini Dressing", "Olive Oil", "Lemon Vinaigrette", "Herb Sauce", 
+        "Cashew Cream", "Yogurt Dressing", "Avocado Sauce", "Pesto", "Salsa",
+        "Hummus", "Hot Sauce", "Chimichurri", "Balsamic Glaze"
+    ]
+    
+    meal_types = [
+        "Bowl", "Plate", "Salad", "Wrap", "Power Box", "Stir-Fry", "Burger",
+        "Sandwich", "Smoothie", "Breakfast", "Snack Pack", "Soup", "Toast"
+    ]
+    
+    adjectives = ["Energy", "Power", "Fit", "Vibrant", "Nourish", "Clean", "Fresh"]
+    
+    def __init__(self, restaurant_ids, all_tags):
+        super().__init__()
+        self.restaurant_ids = frozenset(restaurant_ids)
+        self.all_tags = all_tags
+    
+    def __missing__(self, restaurant_id):
+        if restaurant_id not in self.restaurant_ids:
+            raise KeyError(restaurant_id)
+        
+        menu_items = self._generate_menu(restaurant_id)
+        self[restaurant_id] = menu_items
+        return menu_items
+    
+    def get(self, restaurant_id, default=None):
+        # dict.get() bypasses __missing__, so route it through __getitem__
+        try:
+            return self[restaurant_id]
+        except KeyError:
+            return default
+    
+    def _generate_menu(self, restaurant_id):
+        """Generate the menu items for a single restaurant."""
+        rnd = random.Random(restaurant_id)
+        menu_items = []
+        
+        # Generate 5-8 menu items per restaurant
+        num_items = rnd.randint(5, 8)
+        for j in range(num_items):
+            # Create a unique menu item ID
+            item_id = f"{restaurant_id}_item{j+1}"
+            
+            # Generate a menu item name
+            protein = rnd.choice(self.protein_options)
+            meal_type = rnd.choice(self.meal_types)
+            
+            # Random approach to naming
+            if rnd.random() < 0.5:
+                item_name = f"{protein} {meal_type}"
+            else:
+                item_name = f"{rnd.choice(self.adjectives)} {meal_type}"
+            
+            # Generate price ($7.99-$19.99)
+            price = round(rnd.uniform(7.99, 19.99), 2)
+            
+            # Generate description
+            base = rnd.choice(self.base_options)
+            veggies = rnd.sample(self.veggie_options, 2)
+            sauce = rnd.choice(self.sauce_options)
+            description = f"{protein} with {base}, {veggies[0]}, {veggies[1]}, and {sauce}"
+            
+            # Generate nutritional info
+            calories = rnd.randint(300, 700)
+            protein_g = rnd.randint(15, 45)
+            carbs_g = rnd.randint(20, 80)
+            fat_g = rnd.randint(8, 30)
+            
+            # Select 3 random tags
+            menu_tags = rnd.sample(self.all_tags, 3)
+            
+            # Create the menu item
+            menu_item = MenuItem(
+                id=item_id,
+                name=item_name,
+                price=price,
+                description=description,
+                calories=calories,
+                protein_g=protein_g,
+                carbs_g=carbs_g,
+                fat_g=fat_g,
+                tags=menu_tags,
+                image_url=f"https://source.unsplash.com/300x200/?food,{item_name.replace(' ', '-').lower()}"
+            )
+            
+            menu_items.append(menu_item)
+        
+        return menu_items
+
+
 class UberEatsAPI:
     """
     A client for the Uber Eats API.
@@ -17,26 +243,132 @@ class UberEatsAPI:
     If no API key is provided, it will use mock data for development and testing purposes.
     """
     
-    def __init__(self, api_key=None):
-        """Initialize the Uber Eats API client."""
-        # Load environment variables if not already loaded
-        load_dotenv()
+    # The mock data never changes, so it is generated once and shared by every client
+    _MOCK_CACHE = None
+    _MOCK_LOCK = threading.Lock()
+    MOCK_SEED = 0xC0FFEE
+    
+    # Generated mock data is pickled here so later runs can skip generation.
+    # Bump MOCK_DATA_VERSION whenever the generator changes to invalidate old files.
+    MOCK_DATA_PATH = Path(__file__).with_name("mock_data.pkl")
+    MOCK_DATA_VERSION = 3
+    
+    # Maximum number of (cuisine, health goal) filter results kept by _filter_candidates
+    SEARCH_CACHE_SIZE = 512
+    
+    # How long a cached delivery estimate is served before it is refreshed in the background
+    ESTIMATE_TTL_SECONDS = 30
+    
+    # Maximum number of (restaurant_id, user_location) delivery estimates kept
+    ESTIMATE_CACHE_SIZE = 1024
+    
+    def __init__(self, api_key=None, max_conns=512, per_host=64, concurrency=32):
+        """
+        Initialize the Uber Eats API client.
         
+        Args:
+            api_key (str, optional): Uber Eats API key, defaults to UBER_EATS_API_KEY
+            max_conns (int): Maximum number of concurrent connections to the API
+            per_host (int): Maximum number of concurrent connections per host
+            concurrency (int): Maximum number of in-flight requests for batch helpers
+        """
         self.api_key = api_key or os.getenv("UBER_EATS_API_KEY")
         self.base_url = "https://api.uber.com/v1/eats"  # Base URL for Uber Eats API
         
         # Force use of real API if API key is provided
         self.use_mock = False if self.api_key else True
         
+        # Shared HTTP session for the real API, created on first use
+        self.max_conns = max_conns
+        self.per_host = per_host
+        self.concurrency = concurrency
+        self._session = None
+        
+        # Delivery estimates keyed by (restaurant_id, user_location), with their in-flight refreshes
+        self._estimate_cache = {}
+        self._estimate_refreshes = {}
+        
+        # Cached mock search filter results, keyed by (cuisine, health goal)
+        self._search_cache = {}
+        
         if self.use_mock:
             logger.warning("No Uber Eats API key found. Using mock data.")
             # Load mock data
-            self.mock_data = self._load_mock_data()
+            self.mock_data = self._get_mock_data()
         else:
             logger.info("Using real Uber Eats API with provided key.")
     
-    def _load_mock_data(self):
+    async def _get_session(self):
+        """Return the shared HTTP session, creating it if needed."""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                headers={
+                    "Authorization": f"Bearer {self.api_key}",
+                    "Content-Type": "application/json"
+                },
+                connector=aiohttp.TCPConnector(limit=self.max_conns, limit_per_host=self.per_host, ttl_dns_cache=300)
+            )
+        return self._session
+    
+    async def close(self):
+        """Close the shared HTTP session."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+    
+    @classmethod
+    def _get_mock_data(cls):
+        """Return the shared mock data, generating it on first use."""
+        if cls._MOCK_CACHE is None:
+            with cls._MOCK_LOCK:
+                if cls._MOCK_CACHE is None:
+                    mock_data = cls._read_mock_data_file()
+                    if mock_data is None:
+                        mock_data = cls._load_mock_data()
+                        cls._write_mock_data_file(mock_data)
+                    cls._MOCK_CACHE = mock_data
+        return cls._MOCK_CACHE
+    
+    @classmethod
+    def _read_mock_data_file(cls):
+        """Load previously generated mock data from disk, or return None if unavailable."""
+        try:
+            with open(cls.MOCK_DATA_PATH, "rb") as f:
+                saved = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable mock data file {cls.MOCK_DATA_PATH}: {e}")
+            return None
+        
+        if saved.get("version") != (cls.MOCK_DATA_VERSION, cls.MOCK_SEED):
+            return None
+        return saved["data"]
+    
+    @classmethod
+    def _write_mock_data_file(cls, mock_data):
+        """Save generated mock data to disk for the next run."""
+        tmp_path = cls.MOCK_DATA_PATH.with_suffix(".tmp")
+        try:
+            with open(tmp_path, "wb") as f:
+                pickle.dump({"version": (cls.MOCK_DATA_VERSION, cls.MOCK_SEED), "data": mock_data}, f,
+                            protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, cls.MOCK_DATA_PATH)
+        except OSError as e:
+            logger.warning(f"Could not save mock data to {cls.MOCK_DATA_PATH}: {e}")
+    
+    @classmethod
+    def _load_mock_data(cls):
         """Load mock data for development purposes."""
+        # A dedicated, fixed-seed generator keeps the mock data identical between runs
+        rng = random.Random(cls.MOCK_SEED)
+        
         # Generate 1000+ unique restaurants with realistic names, ratings, etc.
         restaurant_data = {}
         
@@ -96,152 +428,142 @@ class UberEatsAPI:
             "antioxidants", "whole foods", "clean eating", "raw", "balanced nutrition"
         ]
         
+        # Generate 50 unique restaurants per location (1000+ total)
+        restaurants_per_location = 50
+        
         # Generate restaurants for each location
         for location in locations:
             # Create a list to hold restaurants for this location
             restaurant_data[location] = []
+            location_key = location.replace(', ', '_').lower()
+            
+            # Draw the categorical fields for the whole location in one call each
+            prefixes = rng.choices(name_prefixes, k=restaurants_per_location)
+            suffixes = rng.choices(name_suffixes, k=restaurants_per_location)
+            location_cuisines = rng.choices(cuisines, k=restaurants_per_location)
             
-            # Generate 50 unique restaurants per location (1000+ total)
-            for i in range(50):
+            for i, (prefix, suffix, cuisine) in enumerate(zip(prefixes, suffixes, location_cuisines)):
                 # Create a unique ID
-                restaurant_id = f"r{len(restaurant_data[location]) + 1}_{location.replace(', ', '_').lower()}"
+                restaurant_id = f"r{i + 1}_{location_key}"
                 
                 # Generate a unique restaurant name
-                prefix = random.choice(name_prefixes)
-                suffix = random.choice(name_suffixes)
                 restaurant_name = f"{prefix} {suffix}"
                 
                 # Generate realistic rating (3.5-5.0)
-                rating = round(random.uniform(3.5, 5.0), 1)
+                rating = round(rng.uniform(3.5, 5.0), 1)
                 
                 # Generate delivery fee ($0.99-$5.99)
-                delivery_fee = round(random.uniform(0.99, 5.99), 2)
+                delivery_fee = round(rng.uniform(0.99, 5.99), 2)
                 
                 # Generate estimated delivery time
-                min_time = random.randint(10, 30)
-                max_time = min_time + random.randint(5, 15)
+                min_time = rng.randint(10, 30)
+                max_time = min_time + rng.randint(5, 15)
                 estimated_time = f"{min_time}-{max_time} min"
                 
-                # Select a random cuisine
-                cuisine = random.choice(cuisines)
-                
                 # Select 3-5 random tags
-                num_tags = random.randint(3, 5)
-                tags = random.sample(all_tags, num_tags)
+                num_tags = rng.randint(3, 5)
+                tags = rng.sample(all_tags, num_tags)
                 
                 # Create the restaurant object
-                restaurant = {
-                    "id": restaurant_id,
-                    "name": restaurant_name,
-                    "rating": rating,
-                    "delivery_fee": delivery_fee,
-                    "estimated_time": estimated_time,
-                    "cuisine": cuisine,
-                    "tags": tags,
-                    "location": location,
-                    "image_url": f"https://source.unsplash.com/300x200/?food,{cuisine.replace(' ', '-').lower()}"
-                }
+                restaurant = Restaurant(
+                    id=restaurant_id,
+                    name=restaurant_name,
+                    rating=rating,
+                    delivery_fee=delivery_fee,
+                    estimated_time=estimated_time,
+                    cuisine=cuisine,
+                    tags=tags,
+                    location=location,
+                    image_url=f"https://source.unsplash.com/300x200/?food,{cuisine.replace(' ', '-').lower()}"
+                )
                 
                 # Add to the location's restaurant list
                 restaurant_data[location].append(restaurant)
         
-        # Generate menu items for each restaurant
-        menu_data = {}
+        # Flat list of every restaurant, shared by all searches
+        all_restaurants = [r for restaurants in restaurant_data.values() for r in restaurants]
         
-        # Menu item components
-        protein_options = [
-            "Grilled Chicken", "Wild Salmon", "Grass-Fed Beef", "Tofu", "Tempeh", 
-            "Quinoa", "Lentils", "Black Beans", "Chickpeas", "Tuna", "Turkey", 
-            "Plant Protein", "Seitan", "Egg Whites", "Greek Yogurt"
-        ]
+        # Index restaurants by lowercased cuisine and tag for the search filters
+        by_cuisine = {}
+        by_tag = {}
+        for restaurant in all_restaurants:
+            by_cuisine.setdefault(restaurant.cuisine_lc, []).append(restaurant)
+            for tag in restaurant.tags_lc:
+                by_tag.setdefault(tag, []).append(restaurant)
         
-        base_options = [
-            "Brown Rice", "Quinoa", "Mixed Greens", "Spinach", "Kale", "Sweet Potato",
-            "Whole Grain Wrap", "Cauliflower Rice", "Ancient Grains", "Zucchini Noodles",
-            "Buckwheat", "Black Rice", "Farro", "Sprouted Grain"
-        ]
+        # Menus are generated lazily, the first time each restaurant's menu is requested
+        restaurant_ids = [r.id for r in all_restaurants]
         
-        veggie_options = [
-            "Roasted Vegetables", "Steamed Broccoli", "Sautéed Kale", "Bell Peppers",
-            "Cherry Tomatoes", "Cucumber", "Carrots", "Avocado", "Red Onion", "Mushrooms",
-            "Asparagus", "Brussels Sprouts", "Cauliflower", "Green Beans", "Snap Peas"
-        ]
+        return {
+            "restaurants": restaurant_data,
+            "all_restaurants": all_restaurants,
+            "menus": LazyMenus(restaurant_ids, all_tags),
+            "by_cuisine": by_cuisine,
+            "by_tag": by_tag
+        }
+    
+    def _filter_candidates(self, cuisine_lower, health_goal_lower):
+        """
+        Return the mock restaurants matching a cuisine and health goal, either of which may be None.
         
-        sauce_options = [
-            "Tahini Dressing", "Olive Oil", "Lemon Vinaigrette", "Herb Sauce", 
-            "Cashew Cream", "Yogurt Dressing", "Avocado Sauce", "Pesto", "Salsa",
-            "Hummus", "Hot Sauce", "Chimichurri", "Balsamic Glaze"
-        ]
+        The result only depends on the static mock data, so it is cached per (cuisine, health goal).
+        """
+        key = (cuisine_lower, health_goal_lower)
+        cached = self._search_cache.get(key)
+        if cached is not None:
+            return cached
         
-        meal_types = [
-            "Bowl", "Plate", "Salad", "Wrap", "Power Box", "Stir-Fry", "Burger",
-            "Sandwich", "Smoothie", "Breakfast", "Snack Pack", "Soup", "Toast"
-        ]
+        # Apply cuisine filter if specified, using the cuisine/tag indexes
+        if cuisine_lower:
+            restaurants = self._restaurants_for_cuisine(cuisine_lower)
+        else:
+            restaurants = self.mock_data["all_restaurants"]
         
-        # Generate menu items for all restaurants
-        for location in restaurant_data:
-            for restaurant in restaurant_data[location]:
-                menu_items = []
-                restaurant_id = restaurant["id"]
-                
-                # Generate 5-8 menu items per restaurant
-                num_items = random.randint(5, 8)
-                for j in range(num_items):
-                    # Create a unique menu item ID
-                    item_id = f"{restaurant_id}_item{j+1}"
-                    
-                    # Generate a menu item name
-                    protein = random.choice(protein_options)
-                    meal_type = random.choice(meal_types)
-                    
-                    # Random approach to naming
-                    if random.random() < 0.5:
-                        item_name = f"{protein} {meal_type}"
-                    else:
-                        adjectives = ["Energy", "Power", "Fit", "Vibrant", "Nourish", "Clean", "Fresh"]
-                        item_name = f"{random.choice(adjectives)} {meal_type}"
-                    
-                    # Generate price ($7.99-$19.99)
-                    price = round(random.uniform(7.99, 19.99), 2)
-                    
-                    # Generate description
-                    base = random.choice(base_options)
-                    veggies = random.sample(veggie_options, 2)
-                    sauce = random.choice(sauce_options)
-                    description = f"{protein} with {base}, {veggies[0]}, {veggies[1]}, and {sauce}"
-                    
-                    # Generate nutritional info
-                    calories = random.randint(300, 700)
-                    protein_g = random.randint(15, 45)
-                    carbs_g = random.randint(20, 80)
-                    fat_g = random.randint(8, 30)
-                    
-                    # Select 3 random tags
-                    menu_tags = random.sample(all_tags, 3)
-                    
-                    # Create the menu item
-                    menu_item = {
-                        "id": item_id,
-                        "name": item_name,
-                        "price": price,
-                        "description": description,
-                        "calories": calories,
-                        "protein": f"{protein_g}g",
-                        "carbs": f"{carbs_g}g",
-                        "fat": f"{fat_g}g",
-                        "tags": menu_tags,
-                        "image_url": f"https://source.unsplash.com/300x200/?food,{item_name.replace(' ', '-').lower()}"
-                    }
-                    
-                    menu_items.append(menu_item)
-                
-                # Store the menu items
-                menu_data[restaurant_id] = menu_items
+        # Apply health goal filter if specified
+        if health_goal_lower:
+            # Map health goals to tags
+            health_goal_tags = {
+                "weight loss": ["low calorie", "low fat", "weight loss", "calorie counted"],
+                "muscle gain": ["high protein", "protein", "muscle", "bodybuilding"],
+                "energy": ["energy", "carbs", "performance", "endurance"],
+                "general health": ["balanced", "whole foods", "nutritious"],
+                "heart health": ["heart healthy", "low sodium", "omega-3"],
+                "digestion": ["fiber", "probiotics", "gut health"]
+            }
+            
+            # Get relevant tags for this health goal
+            relevant_tags = []
+            for goal, tags in health_goal_tags.items():
+                if health_goal_lower in goal or goal in health_goal_lower:
+                    relevant_tags.extend(tags)
+            
+            # Filter restaurants by relevant tags. Partial matches count (e.g. "protein" matches
+            # "high-protein"), so search all tags at once with a single alternation pattern.
+            if relevant_tags:
+                pattern = re.compile("|".join(map(re.escape, relevant_tags)), re.IGNORECASE)
+                restaurants = (r for r in restaurants if pattern.search(r.tags_joined))
         
-        return {
-            "restaurants": restaurant_data,
-            "menus": menu_data
-        }
+        result = tuple(restaurants)
+        
+        if len(self._search_cache) >= self.SEARCH_CACHE_SIZE:
+            # Evict the oldest entry
+            self._search_cache.pop(next(iter(self._search_cache)))
+        self._search_cache[key] = result
+        return result
+    
+    def _restaurants_for_cuisine(self, cuisine_lower):
+        """
+        Return the mock restaurants whose cuisine or tags contain cuisine_lower.
+        
+        Only the index keys (a few dozen cuisines and tags) are scanned, rather than every restaurant.
+        """
+        matches = {}
+        for index in (self.mock_data["by_cuisine"], self.mock_data["by_tag"]):
+            for key, restaurants in index.items():
+                if cuisine_lower in key:
+                    for restaurant in restaurants:
+                        matches[restaurant.id] = restaurant
+        return list(matches.values())
     
     async def search_restaurants(self, location=None, cuisine_preference=None, health_goal=None, dietary_preferences=None):
         """
@@ -263,49 +585,22 @@ class UberEatsAPI:
                 logger.info(f"Using mock data to search for random restaurants")
                 
                 # Get all restaurants from all locations
-                all_restaurants = []
-                for loc_restaurants in self.mock_data["restaurants"].values():
-                    all_restaurants.extend(loc_restaurants)
+                all_restaurants = self.mock_data["all_restaurants"]
                 
                 logger.info(f"Total available restaurants in database: {len(all_restaurants)}")
                 
-                # Start with a random selection of restaurants
-                # Get a good variety by selecting from entire database
-                initial_selection = random.sample(all_restaurants, min(100, len(all_restaurants)))
-                restaurants = initial_selection
-                
-                # Apply cuisine filter if specified
-                if cuisine_preference:
+                # Apply the cuisine and health goal filters, which are cached per query
+                cuisine_lower = cuisine_preference.lower() if cuisine_preference else None
+                health_goal_lower = health_goal.lower() if health_goal else None
+                if cuisine_lower:
                     logger.info(f"Filtering by cuisine: {cuisine_preference}")
-                    cuisine_lower = cuisine_preference.lower()
-                    restaurants = [r for r in restaurants if cuisine_lower in r["cuisine"].lower() or
-                                    any(cuisine_lower in tag.lower() for tag in r["tags"])]
-                
-                # Apply health goal filter if specified
-                if health_goal:
+                if health_goal_lower:
                     logger.info(f"Filtering by health goal: {health_goal}")
-                    health_goal_lower = health_goal.lower()
-                    
-                    # Map health goals to tags
-                    health_goal_tags = {
-                        "weight loss": ["low calorie", "low fat", "weight loss", "calorie counted"],
-                        "muscle gain": ["high protein", "protein", "muscle", "bodybuilding"],
-                        "energy": ["energy", "carbs", "performance", "endurance"],
-                        "general health": ["balanced", "whole foods", "nutritious"],
-                        "heart health": ["heart healthy", "low sodium", "omega-3"],
-                        "digestion": ["fiber", "probiotics", "gut health"]
-                    }
-                    
-                    # Get relevant tags for this health goal
-                    relevant_tags = []
-                    for goal, tags in health_goal_tags.items():
-                        if health_goal_lower in goal or goal in health_goal_lower:
-                            relevant_tags.extend(tags)
-                    
-                    # Filter restaurants by relevant tags
-                    if relevant_tags:
-                        restaurants = [r for r in restaurants if 
-                                       any(tag.lower() in " ".join(r["tags"]).lower() for tag in relevant_tags)]
+                pool = self._filter_candidates(cuisine_lower, health_goal_lower)
+                
+                # Start with a random selection of the matching restaurants
+                # Get a good variety by selecting from entire database
+                restaurants = random.sample(pool, min(100, len(pool)))
                 
                 # Apply dietary preferences filter if specified
                 if dietary_preferences:
@@ -314,7 +609,7 @@ class UberEatsAPI:
                     filtered_restaurants = []
                     
                     for restaurant in restaurants:
-                        restaurant_tags = " ".join([tag.lower() for tag in restaurant.get("tags", [])])
+                        restaurant_tags = restaurant.tags_lc
                         meets_criteria = True
                         
                         # Special handling for strict dietary requirements
@@ -337,7 +632,8 @@ class UberEatsAPI:
                         
                         # Add more restaurants from the original list to make at least 10
                         remaining_needed = 10 - len(result_restaurants)
-                        other_restaurants = [r for r in original_restaurants if r not in filtered_restaurants]
+                        chosen_ids = {r.id for r in filtered_restaurants}
+                        other_restaurants = [r for r in original_restaurants if r.id not in chosen_ids]
                         if other_restaurants and remaining_needed > 0:
                             addition = random.sample(other_restaurants, min(remaining_needed, len(other_restaurants)))
                             result_restaurants.extend(addition)
@@ -379,20 +675,15 @@ class UberEatsAPI:
                     logger.warning(f"Found less than 10 restaurants ({len(restaurants)}). Relaxing filters to find more.")
                     
                     # Get additional restaurants without dietary filters
-                    all_restaurants = []
-                    for loc_restaurants in self.mock_data["restaurants"].values():
-                        all_restaurants.extend(loc_restaurants)
-                    
                     # Apply only cuisine filter if specified
                     if cuisine_preference:
-                        cuisine_lower = cuisine_preference.lower()
-                        additional_restaurants = [r for r in all_restaurants if cuisine_lower in r["cuisine"].lower() or
-                                            any(cuisine_lower in tag.lower() for tag in r["tags"])]
+                        additional_restaurants = self._restaurants_for_cuisine(cuisine_preference.lower())
                     else:
                         additional_restaurants = all_restaurants
                     
                     # Remove any duplicates
-                    additional_restaurants = [r for r in additional_restaurants if r not in restaurants]
+                    chosen_ids = {r.id for r in restaurants}
+                    additional_restaurants = [r for r in additional_restaurants if r.id not in chosen_ids]
                     
                     # Add more restaurants until we have at least 10
                     needed = 10 - len(restaurants)
@@ -407,18 +698,19 @@ class UberEatsAPI:
                         for i in range(10 - len(restaurants)):
                             restaurant_id = f"extra_{i}_random"
                             restaurant_name = f"Health Spot {i+1}"
-                            restaurants.append({
-                                "id": restaurant_id,
-                                "name": restaurant_name,
-                                "cuisine": "Health Food",
-                                "rating": 4.5,
-                                "delivery_fee": 2.99,
-                                "estimated_time": "15-30 min",
-                                "image_url": "https://example.com/placeholder.jpg",
-                                "tags": ["healthy", "organic", "vegetarian", "vegan", "gluten-free"]
-                            })
+                            restaurants.append(Restaurant(
+                                id=restaurant_id,
+                                name=restaurant_name,
+                                cuisine="Health Food",
+                                rating=4.5,
+                                delivery_fee=2.99,
+                                estimated_time="15-30 min",
+                                image_url="https://example.com/placeholder.jpg",
+                                tags=["healthy", "organic", "vegetarian", "vegan", "gluten-free"]
+                            ))
                 
-                return restaurants
+                # Hand callers plain dicts so they can't mutate the shared mock data
+                return [r.to_dict() for r in restaurants]
             else:
                 # Implementation for real API (simplified)
                 return self._get_sample_restaurants(location, cuisine_preference, health_goal, dietary_preferences)
@@ -494,8 +786,8 @@ class UberEatsAPI:
             list: A list of menu items
         """
         if self.use_mock:
-            # Use mock data
-            menu_items = self.mock_data["menus"].get(restaurant_id, [])
+            # Use mock data, copied so callers can't mutate the shared menus
+            menu_items = [item.to_dict() for item in self.mock_data["menus"].get(restaurant_id, [])]
             
             # Simulate network delay
             # await asyncio.sleep(0.3)
@@ -503,23 +795,19 @@ class UberEatsAPI:
             return menu_items
         else:
             # Use real API
-            async with aiohttp.ClientSession() as session:
-                headers = {
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json"
-                }
-                
-                try:
-                    async with session.get(f"{self.base_url}/restaurants/{restaurant_id}/menu", headers=headers) as response:
-                        if response.status == 200:
-                            data = await response.json()
-                            return data.get("menu_items", [])
-                        else:
-                            logger.error(f"Error getting restaurant menu: {response.status}")
-                            return []
-                except Exception as e:
-                    logger.error(f"Error calling Uber Eats API: {e}")
-                    return []
+            session = await self._get_session()
+            
+            try:
+                async with session.get(f"{self.base_url}/restaurants/{restaurant_id}/menu") as response:
+                    if response.status == 200:
+                        data = await response.json(loads=_json_loads)
+                        return data.get("menu_items", [])
+                    else:
+                        logger.error(f"Error getting restaurant menu: {response.status}")
+                        return []
+            except Exception as e:
+                logger.error(f"Error calling Uber Eats API: {e}")
+                return []
     
     async def filter_menu_by_health_goal(self, menu_items, health_goal):
         """
@@ -535,18 +823,10 @@ class UberEatsAPI:
         if not menu_items or not health_goal:
             return menu_items
         
-        health_goal = health_goal.lower()
-        
-        # Define filtering criteria based on health goals
-        criteria = {
-            "weight loss": lambda item: int(item.get("calories", 1000)) < 500,
-            "muscle gain": lambda item: item.get("protein", "0g").replace("g", "") and int(item.get("protein", "0g").replace("g", "")) > 25,
-            "energy": lambda item: int(item.get("carbs", "0g").replace("g", "")) > 30,
-            "general health": lambda item: any(tag in ["healthy", "balanced", "organic"] for tag in item.get("tags", []))
-        }
-        
         # Apply the appropriate filter
-        filter_func = criteria.get(health_goal, lambda item: True)
+        filter_func = _HEALTH_CRITERIA.get(health_goal.lower())
+        if filter_func is None:
+            return menu_items
         return [item for item in menu_items if filter_func(item)]
     
     async def get_delivery_estimate(self, restaurant_id, user_location):
@@ -571,25 +851,85 @@ class UberEatsAPI:
                 "restaurant_id": restaurant_id
             }
         else:
-            # Use real API
-            async with aiohttp.ClientSession() as session:
-                headers = {
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json"
-                }
-                
-                params = {
-                    "restaurant_id": restaurant_id,
-                    "user_location": user_location
-                }
-                
-                try:
-                    async with session.get(f"{self.base_url}/delivery-estimate", headers=headers, params=params) as response:
-                        if response.status == 200:
-                            return await response.json()
-                        else:
-                            logger.error(f"Error getting delivery estimate: {response.status}")
-                            return {}
-                except Exception as e:
-                    logger.error(f"Error calling Uber Eats API: {e}")
+            # Serve from the cache, refreshing stale entries in the background
+            key = (restaurant_id, user_location)
+            cached = self._estimate_cache.get(key)
+            if cached is None:
+                return await self._refresh_delivery_estimate(key)
+            
+            fetched_at, estimate = cached
+            if time.monotonic() - fetched_at > self.ESTIMATE_TTL_SECONDS and key not in self._estimate_refreshes:
+                self._estimate_refreshes[key] = asyncio.create_task(self._refresh_delivery_estimate(key))
+            return estimate
+    
+    async def _refresh_delivery_estimate(self, key):
+        """Fetch a delivery estimate from the real API and cache it."""
+        try:
+            estimate = await self._fetch_delivery_estimate(*key)
+            if estimate:
+                self._estimate_cache.pop(key, None)
+                if len(self._estimate_cache) >= self.ESTIMATE_CACHE_SIZE:
+                    # Evict the oldest entry
+                    self._estimate_cache.pop(next(iter(self._estimate_cache)))
+                self._estimate_cache[key] = (time.monotonic(), estimate)
+            return estimate
+        finally:
+            self._estimate_refreshes.pop(key, None)
+    
+    async def _fetch_delivery_estimate(self, restaurant_id, user_location):
+        """Get a delivery estimate from the real API."""
+        session = await self._get_session()
+        
+        params = {
+            "restaurant_id": restaurant_id,
+            "user_location": user_location
+        }
+        
+        try:
+            async with session.get(f"{self.base_url}/delivery-estimate", params=params) as response:
+                if response.status == 200:
+                    return await response.json(loads=_json_loads)
+                else:
+                    logger.error(f"Error getting delivery estimate: {response.status}")
                     return {}
+        except Exception as e:
+            logger.error(f"Error calling Uber Eats API: {e}")
+            return {}
+    
+    async def get_menus(self, restaurant_ids):
+        """
+        Get the menus for several restaurants concurrently.
+        
+        Args:
+            restaurant_ids (list): The IDs of the restaurants
+            
+        Returns:
+            list: One menu item list per restaurant, in the same order as restaurant_ids.
+                  A failed lookup is returned as its exception.
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+        
+        async def fetch(restaurant_id):
+            async with semaphore:
+                return await self.get_restaurant_menu(restaurant_id)
+        
+        return await asyncio.gather(*(fetch(r) for r in restaurant_ids), return_exceptions=True)
+    
+    async def get_estimates(self, pairs):
+        """
+        Get delivery estimates for several restaurants concurrently.
+        
+        Args:
+            pairs (list): (restaurant_id, user_location) tuples
+            
+        Returns:
+            list: One estimate dict per pair, in the same order as pairs.
+                  A failed lookup is returned as its exception.
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+        
+        async def fetch(restaurant_id, user_location):
+            async with semaphore:
+                return await self.get_delivery_estimate(restaurant_id, user_location)
+        
+        return await asyncio.gather(*(fetch(r, loc) for r, loc in pairs), return_exceptions=True)
@@ -1,7 +1,19 @@
 import os
 import json
 import asyncio
+import atexit
+import functools
+import re
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 import discord
+try:
+    # uvloop gives the gateway, HTTP and UI server a faster event loop when installed
+    import uvloop
+except ImportError:
+    uvloop = None
 from discord import app_commands
 from discord.ui import Button, View, Select
 import logging
@@ -19,7 +31,7 @@ logging.basicConfig(
 logger = logging.getLogger('gg_nourish')
 
 # Import our modules
-from modules.user_data_manager import UserDataManager
+from modules.user_data_manager import UserDataManager, prune_daily_activity
 from modules.food_module import FoodModule
 from modules.fitness_module import FitnessModule
 
@@ -30,65 +42,286 @@ load_dotenv()
 MISTRAL_API_KEY = os.getenv('MISTRAL_API_KEY')
 MISTRAL_MODEL = "mistral-large-latest"
 DATA_FILE_PATH = "user_data.json"
+STARTUP_CHANNELS_FILE_PATH = "startup_channels.json"
 ACTIVITY_WARNING_THRESHOLD_MINUTES = 60  # 1 hour in minutes (for testing)
+USER_DATA_FLUSH_INTERVAL_SECONDS = 5
+ACTIVITY_FLUSH_INTERVAL_SECONDS = 10
+ACTIVITY_CHECK_INTERVAL_SECONDS = 60  # Matches the one-minute activity increment
+ACTIVITY_CHECK_MAX_INTERVAL_SECONDS = 480  # Backoff ceiling while nobody is active
+MISTRAL_TIMEOUT_SECONDS = 30
+STREAM_CHUNK_MIN_CHARS = 1500  # Streamed replies are sent once this much text ends at a line break
+MIN_CONVERSATION_LENGTH = 5  # Shorter messages never reach Mistral
+RESPONSE_CACHE_SIZE = 256
+RESPONSE_CACHE_TTL_SECONDS = 600
+SYSPROMPT_CACHE_SIZE = 256
+FAVORITE_SETS_CACHE_SIZE = 256
+MISTRAL_MAX_WORKERS = 8
+WORKOUT_TIMER_UPDATE_SECONDS = 5  # How often the workout embed is redrawn
+FITNESS_PLAN_TEMPLATE_TTL_SECONDS = 86400  # Shared bucket plans are regenerated daily
+
+# Conversation system message; only the user-specific slots are filled per call
+SYSTEM_PROMPT_TEMPLATE = """You are GG_Nourish, a friendly and supportive health assistant for gamers.
 
-class GGNourishAgent(discord.Client):
-    def __init__(self, *args, **kwargs):
-        # We'll use the intents from kwargs if provided, otherwise create default intents
-        if 'intents' not in kwargs:
-            intents = discord.Intents.default()
-            intents.message_content = True
-            intents.members = True
-            kwargs['intents'] = intents
-        
-        super().__init__(*args, **kwargs)
-        
-        # Initialize Mistral client
-        self.mistral_client = MistralClient(api_key=MISTRAL_API_KEY) if MISTRAL_API_KEY else None
-        if self.mistral_client:
-            logger.info("Mistral client initialized successfully")
-        else:
-            logger.warning("Mistral client not initialized - API key not found")
-        
-        # Initialize user data manager
-        self.user_data_manager = UserDataManager(DATA_FILE_PATH)
-        
-        # Initialize modules
-        self.food_module = FoodModule(self.mistral_client, self.user_data_manager)
-        self.fitness_module = FitnessModule(self.mistral_client, self.user_data_manager)
-        
-        # Initialize workout UI server
-        self.workout_ui_server = WorkoutUIServer()
-        
-        # We'll start the activity reminder task in setup_hook
-        self.activity_reminder_task = None
-        
-    async def setup_hook(self):
-        """This is called when the client is done preparing data"""
-        logger.info("Setting up activity reminder task")
-        # Start the activity reminder task
-        self.activity_reminder_task = self.loop.create_task(self.check_user_activity())
-        
-        logger.info("Starting workout UI server")
-        # Start the workout UI server
-        await self.workout_ui_server.start()
-        
-    async def on_ready(self):
-        """Called when the bot is ready"""
-        logger.info(f'{self.user} has connected to Discord!')
-        
-        # Set the bot's status
-        await self.change_presence(activity=discord.Game(name="!help for commands"))
-        
-        # Initialize the workout UI server
-        if not hasattr(self, 'workout_ui_server') or not self.workout_ui_server:
-            self.workout_ui_server = WorkoutUIServer()
-        
-        # Start the activity reminder task
-        self.activity_reminder_task = self.loop.create_task(self.check_user_activity())
-        
-        # Send startup messages to all guilds
-        startup_header = """
+USER INFO:
+- Name: {user_name}
+- Health Goal: {health_goal}
+
+**DIETARY RESTRICTIONS - CRITICALLY IMPORTANT:**
+{allergy_block}{diet_block}
+INSTRUCTIONS:
+1. Be conversational and personable - address the user by name
+2. Provide health, nutrition, and fitness advice tailored for gamers
+3. Keep your responses concise but helpful
+4. If the user asks about commands, remind them of the !help command
+5. If they ask about food, suggest using !food or !recipe commands
+6. If they ask about fitness, suggest using !fitnessplan or !workout commands
+7. If they ask about ordering food, suggest using !order command
+8. NEVER suggest foods that conflict with the user's dietary restrictions
+9. ALWAYS be mindful of the user's dietary needs in ANY food-related discussion
+
+Your personality: Friendly, supportive, understanding of gamer lifestyle, encouraging but not pushy
+"""
+
+ALLERGY_BLOCK_TEMPLATE = """
+- FOOD ALLERGIES: {allergies}
+  ***WARNING: Never recommend foods containing these allergens - this is a safety issue***
+"""
+
+DIET_BLOCK_TEMPLATE = """
+- DIETARY PREFERENCES: {diets}
+  ***Always respect these dietary preferences in ALL recommendations***
+"""
+
+# Static parts of the !food / !recipe and !fitnessplan system prompts; the
+# per-request USER CONTEXT block is sent as a separate system message after them
+NUTRITION_SYSTEM_PREFIX = """
+You are GG_Nourish, a nutrition assistant for gamers. You have a friendly, conversational tone and understand gaming culture well.
+
+"""
+
+NUTRITION_SYSTEM_SUFFIX = """IMPORTANT SAFETY INSTRUCTION: You MUST strictly adhere to the user's dietary preferences and restrictions.
+If they have allergies or dietary restrictions, NEVER recommend foods that violate these restrictions.
+
+PERSONALITY INSTRUCTIONS:
+- Be conversational and natural - respond as if you're chatting with a friend
+- Use gaming references and terminology when appropriate
+- Show understanding of gaming-specific challenges (time constraints, need for focus, etc.)
+- Adapt your tone to match the user's energy level and style
+- Acknowledge previous interactions if relevant
+- Be helpful without being judgmental about food choices
+
+Provide personalized food recommendations that:
+1. Match their query
+2. Support their health goal (if specified)
+3. STRICTLY FOLLOW their dietary preferences/restrictions (this is critical for safety)
+4. Are suitable for gamers (easy to eat, not messy for keyboards/controllers)
+5. Include nutritional benefits specifically relevant to gaming performance (focus, energy, etc.)
+
+Keep your response concise but helpful. Address them by name and reference their specific situation.
+"""
+
+FITNESS_SYSTEM_PREFIX = """
+You are GG_Nourish, a fitness and nutrition assistant for gamers. You have a friendly, conversational tone and understand gaming culture well.
+
+"""
+
+FITNESS_SYSTEM_SUFFIX = """IMPORTANT SAFETY INSTRUCTION: You MUST strictly adhere to the user's health goals and preferences.
+If they have specific requirements or restrictions, NEVER recommend exercises that violate these restrictions.
+
+PERSONALITY INSTRUCTIONS:
+- Be conversational and natural - respond as if you're chatting with a friend
+- Use gaming references and terminology when appropriate
+- Show understanding of gaming-specific challenges (time constraints, need for focus, etc.)
+- Adapt your tone to match the user's energy level and style
+- Acknowledge previous interactions if relevant
+- Be helpful without being judgmental about their fitness level
+
+Create a personalized fitness plan that:
+1. Aligns with their health goal
+2. Is suitable for gamers who sit for long periods
+3. Includes exercises that can be done at home with minimal equipment
+4. Addresses common issues gamers face (wrist strain, back pain, eye fatigue)
+5. Can be broken down into short sessions that fit between gaming sessions
+
+Format your response conversationally, addressing them by name. Include:
+- A catchy name for their fitness plan
+- A brief introduction explaining the benefits of the plan
+- A weekly schedule with specific exercises
+- Tips for incorporating movement into gaming sessions
+- Stretches or exercises that can be done during loading screens or between matches
+
+Keep your response concise but helpful.
+"""
+
+# Placeholder name used when generating a fitness plan shared by a goal bucket
+FITNESS_PLAN_NAME_SLOT = "{{user_name}}"
+
+# Health goal bucket -> whole words or phrases that place a goal in it; checked in order
+FITNESS_GOAL_BUCKETS = (
+    ("weight loss", ("lose weight", "weight loss", "fat loss", "burn fat", "slim down", "get lean")),
+    ("muscle", ("muscle", "muscles", "strength", "stronger", "bulk")),
+    ("energy", ("energy", "tired", "fatigue", "stamina")),
+    ("focus", ("focus", "concentration", "concentrate", "reaction time", "mental")),
+    ("posture", ("posture", "back pain", "wrist", "wrists", "neck")),
+)
+FITNESS_GOAL_BUCKET_PATTERNS = tuple(
+    (bucket, re.compile(r"\b(?:" + "|".join(map(re.escape, keywords)) + r")\b", re.IGNORECASE))
+    for bucket, keywords in FITNESS_GOAL_BUCKETS
+)
+
+def fitness_goal_bucket(health_goal):
+    """Map a free-text health goal to a shared fitness plan bucket, or None"""
+    for bucket, pattern in FITNESS_GOAL_BUCKET_PATTERNS:
+        if pattern.search(health_goal):
+            return bucket
+    return None
+
+# The static text goes first as its own message so every request shares the same
+# prompt prefix, which lets the provider reuse its cached prefill
+NUTRITION_SYSTEM_PROMPT = NUTRITION_SYSTEM_PREFIX + NUTRITION_SYSTEM_SUFFIX
+FITNESS_SYSTEM_PROMPT = FITNESS_SYSTEM_PREFIX + FITNESS_SYSTEM_SUFFIX
+
+# Per-command text for the !recipe and !food handlers, which share one code path
+NUTRITION_COMMANDS = {
+    'recipe': {
+        'usage': "Hey {user_name}, please list some ingredients you have on hand. For example: `!recipe chicken, rice, broccoli`",
+        'header': "**🍳 Here's your recipe, {user_name}!**",
+        'continued': "**Recipe continued**",
+        'task': "creating a recipe",
+        'log_name': "recipe",
+    },
+    'food': {
+        'usage': "Hey {user_name}, please tell me what kind of food you're looking for. For example: `!food healthy breakfast ideas` or `!food quick protein snacks`",
+        'header': "**🍔 Food recommendations for {user_name}**",
+        'continued': "**Recommendations continued**",
+        'task': "generating food recommendations",
+        'log_name': "food recommendations",
+    },
+}
+
+# Meal named in the !order closing message, indexed by hour of the day
+MEAL_BY_HOUR = (
+    ("late-night meal",) * 5 + ("breakfast",) * 6 + ("lunch",) * 4 + ("dinner",) * 7 + ("late-night meal",) * 2
+)
+
+# Sent by !start
+START_MESSAGE_TEMPLATE = """
+```
+╔════════════════════════════════════════════════════════════════════════════╗
+║                                                                            ║
+║                 WELCOME TO YOUR HEALTH JOURNEY!                            ║
+║                                                                            ║
+╚════════════════════════════════════════════════════════════════════════════╝
+```
+
+**Welcome to GG_Nourish, {user_name}!** 🎮 + 💪 = 🌟
+
+I'm your personal health assistant designed specifically for gamers. Let's start your journey to a healthier gaming lifestyle!
+
+**First Steps:**
+
+1️⃣ Set your health goal with `!healthgoal [your goal]`
+   Example: `!healthgoal I want to have more energy during gaming sessions`
+
+2️⃣ Explore healthy food options with `!food [preference]`
+   Example: `!food something quick and nutritious`
+
+3️⃣ Take a quick workout break with `!workout`
+   (These are designed to fit between gaming sessions!)
+
+**What Makes GG_Nourish Special:**
+• Activity monitoring that reminds you to take breaks
+• Personalized food and recipe recommendations
+• Quick workout routines designed for gamers
+• Progress tracking with `!stats`
+
+Ready to level up your health while gaming? Let's get started!
+"""
+
+# Sent by !order when no location is given
+ORDER_HELP_TEMPLATE = """
+Hey {user_name}! 🍽️ **Ready to order some healthy food?**
+
+To get restaurant recommendations based on your health goals and dietary preferences, use the `!order` command followed by your location:
+
+Example: `!order San Francisco` or `!order New York`
+
+**The food ordering workflow:**
+1. Set your health goal with `!healthgoal` (if you haven't already)
+2. Set any dietary restrictions with `!dietary` (if applicable)
+3. Use `!order [location]` to get restaurant recommendations that match your needs
+4. View the recommended restaurants and their healthy menu options
+
+**Note:** Your dietary preferences will be strictly respected in all recommendations for your safety.
+
+Try it now with: `!order [your location]`
+"""
+
+# Static part of the !help embed; the footer carries the user's name
+HELP_EMBED_FIELDS = (
+    {
+        "name": "Getting Started",
+        "value": (
+            "`!start` - Begin your health journey\n"
+            "`!help` - Show this help message\n"
+            "`!stats` - View your progress and stats"
+        ),
+        "inline": False,
+    },
+    {
+        "name": "Health Goals",
+        "value": (
+            "`!healthgoal [goal]` - Set your health goal\n"
+            "Example: `!healthgoal I want to build muscle while gaming`"
+        ),
+        "inline": False,
+    },
+    {
+        "name": "Dietary Preferences",
+        "value": (
+            "`!diet` - View your current dietary preferences\n"
+            "`!diet [preferences]` - Set your dietary preferences\n"
+            "Example: `!diet vegetarian, gluten-free, no dairy`"
+        ),
+        "inline": False,
+    },
+    {
+        "name": "Food & Nutrition",
+        "value": (
+            "`!food [preference]` - Get food recommendations\n"
+            "`!recipe [ingredients]` - Generate a recipe\n"
+            "`!order [location]` - Find healthy restaurants near you"
+        ),
+        "inline": False,
+    },
+    {
+        "name": "Fitness & Exercise",
+        "value": (
+            "`!fitnessplan` - Get a personalized fitness plan\n"
+            "`!workout` - Start a quick workout break"
+        ),
+        "inline": False,
+    },
+    {
+        "name": "Favorites",
+        "value": (
+            "`!favorites` - View your favorites\n"
+            "`!addfavorite restaurant [name]` - Add a restaurant to favorites\n"
+            "`!addfavorite recipe [name]` - Add a recipe to favorites"
+        ),
+        "inline": False,
+    },
+    {
+        "name": "Testing",
+        "value": (
+            "`!test activity` - Simulate activity detection"
+        ),
+        "inline": False,
+    },
+)
+
+# Startup messages sent to each guild when the bot connects
+STARTUP_HEADER = """
 ```
 ╔════════════════════════════════════════════════════════════════════════════╗
 ║                                                                            ║
@@ -103,7 +336,7 @@ class GGNourishAgent(discord.Client):
 GG_Nourish is a specialized Discord bot designed for gamers who want to maintain a healthy lifestyle while enjoying their gaming sessions. The bot monitors your activity, provides personalized nutrition advice, and offers quick exercise breaks to prevent health issues associated with long gaming sessions.
 """
 
-        startup_features = """
+STARTUP_FEATURES = """
 ## Main Features:
 • **Activity Monitoring**: Automatically detects when you've been gaming too long and suggests breaks
 • **Food Recommendations**: Get personalized food suggestions based on your preferences
@@ -113,7 +346,7 @@ GG_Nourish is a specialized Discord bot designed for gamers who want to maintain
 • **Workout Timer**: Follow guided 10-minute exercise breaks between gaming sessions
 """
 
-        startup_getting_started = """
+STARTUP_GETTING_STARTED = """
 ## How to Get Started:
 1. Type `!start` to begin your health journey
 2. Set your health goal with `!healthgoal [your goal]`
@@ -128,7 +361,7 @@ Studies show that gamers often neglect their health during intense gaming sessio
 - Tracking your health progress over time
 """
 
-        startup_food_ordering = """
+STARTUP_FOOD_ORDERING = """
 ## How to Order Food with Uber Eats:
 1. Set your health goal with `!healthgoal [your goal]`
 2. Use `!order [your location]` (e.g., `!order San Francisco, CA`)
@@ -141,25 +374,276 @@ Type `!help` at any time to see all available commands.
 
 Ready to level up your health while gaming? Type `!start` to begin!
 """
+
+# Each startup message is already under Discord's 2000 character limit
+STARTUP_CHUNKS = (STARTUP_HEADER, STARTUP_FEATURES, STARTUP_GETTING_STARTED, STARTUP_FOOD_ORDERING)
+
+def _pack_messages(chunks, limit=1990):
+    """Greedily join chunks into as few messages of at most limit characters as possible"""
+    packed = []
+    current = ""
+    for chunk in chunks:
+        if current and len(current) + len(chunk) + 2 <= limit:
+            current += "\n\n" + chunk
+        else:
+            if current:
+                packed.append(current)
+            current = chunk
+    if current:
+        packed.append(current)
+    return tuple(packed)
+
+# Startup chunks merged to spend fewer of Discord's per-channel send budget
+STARTUP_PACKED = _pack_messages(STARTUP_CHUNKS)
+
+class GGNourishAgent(discord.Client):
+    def __init__(self, *args, **kwargs):
+        # We'll use the intents from kwargs if provided, otherwise create default intents
+        if 'intents' not in kwargs:
+            intents = discord.Intents.default()
+            intents.message_content = True
+            intents.members = True
+            kwargs['intents'] = intents
         
-        # Send to the first channel in each guild
-        for guild in self.guilds:
-            sent = False
-            for channel in guild.text_channels:
-                # Check if we have permission to send messages in this channel
-                if channel.permissions_for(guild.me).send_messages:
-                    try:
-                        await channel.send(startup_header)
-                        await channel.send(startup_features)
-                        await channel.send(startup_getting_started)
-                        await channel.send(startup_food_ordering)
-                        sent = True
-                        break
-                    except Exception as e:
-                        logger.error(f"Failed to send startup message to {channel.name} in {guild.name}: {e}")
-            
-            if not sent:
-                logger.warning(f"Could not send startup message to any channel in {guild.name}")
+        super().__init__(*args, **kwargs)
+        
+        # Initialize Mistral client; the agent and its modules share this one client,
+        # so every call reuses its pooled keep-alive connections
+        self.mistral_client = MistralClient(api_key=MISTRAL_API_KEY) if MISTRAL_API_KEY else None
+        if self.mistral_client:
+            logger.info("Mistral client initialized successfully")
+        else:
+            logger.warning("Mistral client not initialized - API key not found")
+        
+        # Mistral's client is synchronous, so its calls run on worker threads
+        self._llm_executor = ThreadPoolExecutor(max_workers=MISTRAL_MAX_WORKERS, thread_name_prefix="mistral")
+        
+        # Initialize user data manager; user data stays in memory and is
+        # written to disk by the flush task instead of on every save
+        self.user_data_manager = UserDataManager(DATA_FILE_PATH, write_back=True)
+        self.user_data_flush_task = None
+        self.activity_flush_task = None
+        atexit.register(self.user_data_manager.flush)
+        
+        # Initialize modules
+        self.food_module = FoodModule(self.mistral_client, self.user_data_manager)
+        self.fitness_module = FitnessModule(self.mistral_client, self.user_data_manager)
+        
+        # Initialize workout UI server
+        self.workout_ui_server = WorkoutUIServer()
+        
+        # We'll start the activity reminder task in setup_hook
+        self.activity_reminder_task = None
+        
+        # user_id -> [last message timestamp, message count] not yet applied to user data
+        self._pending_activity = {}
+        
+        # Wakes the activity task early when a message arrives while it is backed off
+        self._activity_wakeup = asyncio.Event()
+        self._activity_idle = False
+        
+        # user_id -> (raw session_start string, parsed datetime)
+        self._session_starts = {}
+        
+        # (user_id, activity_data key) -> monotonic time the activity loop last wrote that key
+        self._activity_marks = {}
+        
+        # Compiled conversation system messages keyed by user profile
+        self._sysprompt_cache = {}
+        
+        # Health goal bucket -> (monotonic time, generic plan with FITNESS_PLAN_NAME_SLOT for the name)
+        self._fitness_plan_templates = {}
+        
+        # user_id -> (user's data version, (health_goal, dietary_prefs, dietary_prefs_text))
+        self._user_ctx_cache = {}
+        
+        # user_id -> formatted recent conversation context, refreshed by save_conversation_entry
+        self._ctx_cache = {}
+        
+        # Cached !food / !recipe answers: key -> (monotonic time, response)
+        self._response_cache = {}
+        
+        # (user_id, 'restaurants' | 'recipes') -> set mirroring the stored favorites list
+        self._favorite_sets = {}
+        
+        # user_id -> lock held while an activity warning is being sent
+        self._warn_locks = {}
+        
+        # Guild id -> channel id that last received the startup messages
+        self._startup_channel_cache = self._load_startup_channels()
+        
+    async def setup_hook(self):
+        """This is called when the client is done preparing data"""
+        logger.info("Setting up activity reminder task")
+        # Start the activity reminder task
+        self.activity_reminder_task = self.loop.create_task(self.check_user_activity())
+        
+        # Start the user data flush task
+        self.user_data_flush_task = self.loop.create_task(self.flush_user_data_loop())
+        self.activity_flush_task = self.loop.create_task(self.flush_activity_loop())
+        
+        # atexit does not run when the process is terminated by a signal, so
+        # shut down through close() to apply buffered activity and flush user data
+        try:
+            self.loop.add_signal_handler(signal.SIGTERM, lambda: self.loop.create_task(self.close()))
+        except NotImplementedError:
+            # Windows event loops do not support signal handlers
+            pass
+        
+        logger.info("Starting workout UI server")
+        # Start the workout UI server
+        await self.workout_ui_server.start()
+        
+    async def flush_user_data_loop(self):
+        """Periodically write changed user data to disk
+        
+        Serialization happens on the event loop so the data cannot change mid-dump;
+        the file write itself runs on a worker thread
+        """
+        while not self.is_closed():
+            await asyncio.sleep(USER_DATA_FLUSH_INTERVAL_SECONDS)
+            try:
+                snapshot = self.user_data_manager.take_snapshot()
+                if snapshot is not None:
+                    await asyncio.to_thread(self.user_data_manager.write_snapshot, snapshot)
+            except Exception as e:
+                logger.error(f"Error flushing user data: {e}")
+        
+    def apply_pending_activity(self):
+        """Apply the activity buffered by on_message to the user data"""
+        pending, self._pending_activity = self._pending_activity, {}
+        for user_id, (last_seen, count) in pending.items():
+            self.user_data_manager.update_user_activity(user_id, datetime.fromtimestamp(last_seen), count)
+        
+    async def flush_activity_loop(self):
+        """Periodically apply buffered activity so bursts of messages coalesce"""
+        while not self.is_closed():
+            await asyncio.sleep(ACTIVITY_FLUSH_INTERVAL_SECONDS)
+            try:
+                self.apply_pending_activity()
+            except Exception as e:
+                logger.error(f"Error applying user activity: {e}")
+        
+    async def close(self):
+        """Flush pending user data before shutting down"""
+        try:
+            self.apply_pending_activity()
+            self.user_data_manager.flush()
+        except Exception as e:
+            logger.error(f"Error flushing user data on shutdown: {e}")
+        try:
+            await self.food_module.close()
+        except Exception as e:
+            logger.error(f"Error closing the Uber Eats session on shutdown: {e}")
+        self._llm_executor.shutdown(wait=False, cancel_futures=True)
+        await super().close()
+        
+    async def mistral_chat(self, **kwargs):
+        """Run a blocking Mistral chat call on the executor without stalling the event loop"""
+        loop = asyncio.get_running_loop()
+        return await asyncio.wait_for(
+            loop.run_in_executor(self._llm_executor, functools.partial(self.mistral_client.chat, **kwargs)),
+            timeout=MISTRAL_TIMEOUT_SECONDS
+        )
+        
+    async def mistral_chat_stream(self, **kwargs):
+        """Yield Mistral response text as it is generated
+        
+        The blocking stream is consumed on the executor and handed back to the
+        event loop piece by piece; MISTRAL_TIMEOUT_SECONDS bounds the wait for each piece
+        """
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        stop = threading.Event()
+        done = object()
+        
+        def pump():
+            try:
+                for chunk in self.mistral_client.chat_stream(**kwargs):
+                    if stop.is_set():
+                        return
+                    content = chunk.choices[0].delta.content
+                    if content:
+                        loop.call_soon_threadsafe(queue.put_nowait, content)
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, done)
+        
+        loop.run_in_executor(self._llm_executor, pump)
+        try:
+            while True:
+                item = await asyncio.wait_for(queue.get(), timeout=MISTRAL_TIMEOUT_SECONDS)
+                if item is done:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # Let the worker stop early if the caller gave up on the stream
+            stop.set()
+        
+    async def on_ready(self):
+        """Called when the bot is ready"""
+        logger.info(f'{self.user} has connected to Discord!')
+        
+        # Set the bot's status
+        await self.change_presence(activity=discord.Game(name="!help for commands"))
+        
+        # Initialize the workout UI server
+        if not hasattr(self, 'workout_ui_server') or not self.workout_ui_server:
+            self.workout_ui_server = WorkoutUIServer()
+        
+        # Send to the first channel in each guild, all guilds concurrently
+        await asyncio.gather(
+            *(self._send_startup(guild, STARTUP_PACKED) for guild in self.guilds),
+            return_exceptions=True
+        )
+    
+    def _load_startup_channels(self):
+        """Load the saved startup channel for each guild"""
+        if not os.path.exists(STARTUP_CHANNELS_FILE_PATH):
+            return {}
+        try:
+            with open(STARTUP_CHANNELS_FILE_PATH, 'r') as f:
+                return {int(guild_id): channel_id for guild_id, channel_id in json.load(f).items()}
+        except (OSError, ValueError, AttributeError) as e:
+            logger.error(f"Error loading startup channels: {e}")
+            return {}
+    
+    def _save_startup_channels(self):
+        """Persist the startup channel for each guild so restarts skip the scan"""
+        try:
+            with open(STARTUP_CHANNELS_FILE_PATH, 'w') as f:
+                json.dump(self._startup_channel_cache, f)
+        except OSError as e:
+            logger.error(f"Error saving startup channels: {e}")
+    
+    async def _send_startup(self, guild, startup_messages):
+        """Send the startup messages to the first channel in a guild that allows it"""
+        # Try the channel that worked last time before scanning the guild
+        cached_channel = guild.get_channel(self._startup_channel_cache.get(guild.id, 0))
+        if cached_channel and cached_channel.permissions_for(guild.me).send_messages:
+            candidates = [cached_channel]
+        else:
+            candidates = []
+        candidates.extend(c for c in guild.text_channels if c is not cached_channel)
+        
+        for channel in candidates:
+            # Check if we have permission to send messages in this channel
+            if channel is cached_channel or channel.permissions_for(guild.me).send_messages:
+                try:
+                    # Sends within a channel stay sequential to keep their order
+                    for startup_message in startup_messages:
+                        await channel.send(startup_message)
+                    if self._startup_channel_cache.get(guild.id) != channel.id:
+                        self._startup_channel_cache[guild.id] = channel.id
+                        self._save_startup_channels()
+                    return
+                except Exception as e:
+                    logger.error(f"Failed to send startup message to {channel.name} in {guild.name}: {e}")
+        
+        logger.warning(f"Could not send startup message to any channel in {guild.name}")
     
     async def on_message(self, message):
         """Called when a message is sent in a channel the bot can see"""
@@ -171,8 +655,15 @@ Ready to level up your health while gaming? Type `!start` to begin!
         user_name = message.author.display_name
         user_id = str(message.author.id)
             
-        # Update user activity timestamp
-        self.user_data_manager.update_user_activity(user_id)
+        # Buffer the activity; flush_activity_loop applies it to user data
+        pending = self._pending_activity.get(user_id)
+        if pending:
+            pending[0] = time.time()
+            pending[1] += 1
+        else:
+            self._pending_activity[user_id] = [time.time(), 1]
+        if self._activity_idle:
+            self._activity_wakeup.set()
         
         # Process commands
         if message.content.startswith('!'):
@@ -189,33 +680,10 @@ Ready to level up your health while gaming? Type `!start` to begin!
         command = parts[0][1:].lower()  # Remove the ! and convert to lowercase
         args = parts[1] if len(parts) > 1 else ""
         
-        # Process different commands
-        if command == 'help':
-            await self.send_help_message(message.channel, user_name)
-        elif command == 'start':
-            await self.send_start_message(message.channel, user_id, user_name)
-        elif command == 'healthgoal':
-            await self.process_health_goal_command(message, args, user_id, user_name)
-        elif command == 'stats':
-            await self.process_stats_command(message, user_id, user_name)
-        elif command == 'food':
-            await self.process_food_command(message, args, user_id, user_name)
-        elif command == 'recipe':
-            await self.process_recipe_command(message, args, user_id, user_name)
-        elif command == 'fitnessplan':
-            await self.process_fitness_plan_command(message, user_id, user_name)
-        elif command == 'workout':
-            await self.process_workout_command(message, user_id, user_name)
-        elif command == 'order':
-            await self.process_order_command(message, args, user_id, user_name)
-        elif command == 'diet' or command == 'dietary':
-            await self.process_dietary_command(message, args, user_id, user_name)
-        elif command == 'addfavorite':
-            await self.process_add_favorite_command(message, args, user_id, user_name)
-        elif command == 'favorites':
-            await self.process_favorites_command(message, user_id, user_name)
-        elif command == 'test':
-            await self.process_test_command(message, args, user_id, user_name)
+        # Dispatch to the command handler with a single lookup
+        handler = self.COMMAND_TABLE.get(command)
+        if handler:
+            await handler(self, message, args, user_id, user_name)
         else:
             await message.channel.send(f"Sorry {user_name}, I don't recognize that command. Type `!help` for a list of commands.")
     
@@ -227,6 +695,10 @@ Ready to level up your health while gaming? Type `!start` to begin!
             
         user_message = message.content
         
+        # Skip chatter not worth a Mistral call: other bots, "gg"/"lol" replies and bare links
+        if message.author.bot or len(user_message.strip()) < MIN_CONVERSATION_LENGTH or user_message.startswith(('http://', 'https://')):
+            return
+        
         # Get user data
         user_data = self.user_data_manager.get_user_data(user_id)
         health_goal_data = user_data.get('health_goal', {})
@@ -239,70 +711,33 @@ Ready to level up your health while gaming? Type `!start` to begin!
         
         # Get dietary preferences
         dietary_preferences = user_data.get('dietary_preferences', {})
-        diet_restrictions = []
         allergies = []
         diets = []
         
         if dietary_preferences:
             if 'allergies' in dietary_preferences:
                 allergies = dietary_preferences['allergies']
-                diet_restrictions.extend(allergies)
             if 'diets' in dietary_preferences:
                 diets = dietary_preferences['diets']
-                diet_restrictions.extend(diets)
                 
-        # Log dietary restrictions
-        if diet_restrictions:
-            logger.info(f"Including dietary restrictions in conversation for user {user_id}: {diet_restrictions}")
-        
-        # Create system message for Mistral
-        system_message = f"""You are GG_Nourish, a friendly and supportive health assistant for gamers.
-
-USER INFO:
-- Name: {user_name}
-- Health Goal: {health_goal if health_goal else "Not specified yet"}
-"""
-
-        # Add dietary restrictions section - ALWAYS include this section even if empty
-        system_message += f"""
-**DIETARY RESTRICTIONS - CRITICALLY IMPORTANT:**
-"""
-
-        if allergies:
-            system_message += f"""
-- FOOD ALLERGIES: {', '.join(allergies)}
-  ***WARNING: Never recommend foods containing these allergens - this is a safety issue***
-"""
-        else:
-            system_message += "- No known food allergies\n"
-
-        if diets:
-            system_message += f"""
-- DIETARY PREFERENCES: {', '.join(diets)}
-  ***Always respect these dietary preferences in ALL recommendations***
-"""
-        else:
-            system_message += "- No specific dietary preferences\n"
-            
-        system_message += """
-INSTRUCTIONS:
-1. Be conversational and personable - address the user by name
-2. Provide health, nutrition, and fitness advice tailored for gamers
-3. Keep your responses concise but helpful
-4. If the user asks about commands, remind them of the !help command
-5. If they ask about food, suggest using !food or !recipe commands
-6. If they ask about fitness, suggest using !fitnessplan or !workout commands
-7. If they ask about ordering food, suggest using !order command
-8. NEVER suggest foods that conflict with the user's dietary restrictions
-9. ALWAYS be mindful of the user's dietary needs in ANY food-related discussion
-
-Your personality: Friendly, supportive, understanding of gamer lifestyle, encouraging but not pushy
-"""
+        # Log dietary restrictions; %-style args are only formatted when INFO is enabled
+        if allergies or diets:
+            logger.info("Including dietary restrictions in conversation for user %s: %s / %s", user_id, allergies, diets)
+        
+        # Reuse the compiled system message unless the user's profile changed
+        cache_key = (user_name, health_goal, tuple(sorted(allergies)), tuple(sorted(diets)))
+        system_message = self._sysprompt_cache.get(cache_key)
+        if system_message is None:
+            system_message = self._build_system_message(user_name, health_goal, allergies, diets)
+            # Evict the oldest entry when full, like the response cache
+            if len(self._sysprompt_cache) >= SYSPROMPT_CACHE_SIZE:
+                self._sysprompt_cache.pop(next(iter(self._sysprompt_cache)))
+            self._sysprompt_cache[cache_key] = system_message
 
         try:
             # Send a typing indicator while generating
             async with message.channel.typing():
-                response = self.mistral_client.chat(
+                response = await self.mistral_chat(
                     model=MISTRAL_MODEL,
                     messages=[
                         {"role": "system", "content": system_message},
@@ -312,18 +747,38 @@ Your personality: Friendly, supportive, understanding of gamer lifestyle, encour
                 
                 ai_response = response.choices[0].message.content
                 
-                # Split message if it's too long
-                if len(ai_response) > 1900:
-                    parts = self.split_message(ai_response)
-                    for part in parts:
-                        await message.channel.send(part)
-                else:
-                    await message.channel.send(ai_response)
+                # Split message if it's too long; parts are sent in order
+                for part in self._split_1900(ai_response):
+                    await message.channel.send(part)
                 
         except Exception as e:
             logger.error(f"Error processing conversation: {e}")
             await message.channel.send(f"Sorry {user_name}, I'm having trouble understanding right now. Try using a command like !help to see what I can do.")
     
+    def _build_system_message(self, user_name, health_goal, allergies, diets):
+        """Build the Mistral system message for a user's profile"""
+        if allergies:
+            allergy_block = ALLERGY_BLOCK_TEMPLATE.format(allergies=', '.join(allergies))
+        else:
+            allergy_block = "- No known food allergies\n"
+
+        if diets:
+            diet_block = DIET_BLOCK_TEMPLATE.format(diets=', '.join(diets))
+        else:
+            diet_block = "- No specific dietary preferences\n"
+
+        return SYSTEM_PROMPT_TEMPLATE.format_map({
+            'user_name': user_name,
+            'health_goal': health_goal if health_goal else "Not specified yet",
+            'allergy_block': allergy_block,
+            'diet_block': diet_block,
+        })
+
+    def _invalidate_sysprompt(self, user_name):
+        """Drop cached system messages for a user after their profile changes"""
+        for key in [key for key in self._sysprompt_cache if key[0] == user_name]:
+            del self._sysprompt_cache[key]
+
     async def process_health_goal_command(self, message, args, user_id, user_name):
         """Process the !healthgoal command"""
         if not args:
@@ -337,10 +792,11 @@ Your personality: Friendly, supportive, understanding of gamer lifestyle, encour
             'set_at': datetime.now().isoformat()
         }
         self.user_data_manager.save_user_data(user_id, user_data)
+        self._invalidate_sysprompt(user_name)
         
         # Generate a response using Mistral AI
         try:
-            response = self.mistral_client.chat(
+            response = await self.mistral_chat(
                 model="mistral-tiny",
                 messages=[
                     {"role": "system", "content": "You are a health assistant for gamers. Be encouraging and positive."},
@@ -355,7 +811,7 @@ Your personality: Friendly, supportive, understanding of gamer lifestyle, encour
             logger.error(f"Error generating health goal response: {e}")
             await message.channel.send(f"Hey {user_name}, I've saved your health goal: **{args}**\n\nI'll help you achieve this goal with personalized recommendations!")
     
-    async def process_stats_command(self, message, user_id, user_name):
+    async def process_stats_command(self, message, args, user_id, user_name):
         """Process the !stats command to show user health statistics and progress"""
         # Get user data
         user_data = self.user_data_manager.get_user_data(user_id)
@@ -373,168 +829,72 @@ Your personality: Friendly, supportive, understanding of gamer lifestyle, encour
             health_goal = str(health_goal_data) if health_goal_data else 'Not set'
             
         # Get start date
-        start_date_str = user_data.get('start_date', None)
+        now = time.time()
         days_active = 0
-        if start_date_str:
+        if user_data.get('start_date'):
             try:
-                start_date = datetime.fromisoformat(start_date_str)
-                days_active = (datetime.now() - start_date).days + 1
-            except:
+                start_ts = self._get_epoch_timestamp(user_data, 'start_date')
+                days_active = int((now - start_ts) // 86400) + 1
+            except (TypeError, ValueError):
                 days_active = 0
                 
         # Get workout stats
         total_workouts = len(user_data.get('workout_history', []))
-        last_workout_time = user_data.get('last_workout_time', None)
         last_workout_str = "Never"
-        if last_workout_time:
+        if user_data.get('last_workout_time'):
             try:
-                last_workout = datetime.fromisoformat(last_workout_time)
+                last_workout_ts = self._get_epoch_timestamp(user_data, 'last_workout_time')
                 # Format as "X days ago" or "Today" or "Yesterday"
-                days_since = (datetime.now() - last_workout).days
+                days_since = int((now - last_workout_ts) // 86400)
                 if days_since == 0:
                     last_workout_str = "Today"
                 elif days_since == 1:
                     last_workout_str = "Yesterday"
                 else:
                     last_workout_str = f"{days_since} days ago"
-            except:
+            except (TypeError, ValueError):
                 last_workout_str = "Unknown"
                 
-        # Create stats embed
-        embed = discord.Embed(
-            title=f"📊 Health Stats for {user_name}",
-            description=f"Here's your health journey progress!",
-            color=0x00ff00
-        )
-        
         # Add fields to embed
-        embed.add_field(name="🎯 Health Goal", value=health_goal, inline=False)
-        embed.add_field(name="📅 Days Active", value=str(days_active), inline=True)
-        embed.add_field(name="💪 Total Workouts", value=str(total_workouts), inline=True)
-        embed.add_field(name="⏱️ Last Workout", value=last_workout_str, inline=True)
+        fields = [
+            {"name": "🎯 Health Goal", "value": health_goal, "inline": False},
+            {"name": "📅 Days Active", "value": str(days_active), "inline": True},
+            {"name": "💪 Total Workouts", "value": str(total_workouts), "inline": True},
+            {"name": "⏱️ Last Workout", "value": last_workout_str, "inline": True},
+        ]
         
         # Add fitness plan if available
         if 'fitness_plan' in user_data:
-            embed.add_field(name="🏋️ Fitness Plan", value="You have a personalized fitness plan! Use `!fitnessplan` to view it.", inline=False)
+            fields.append({"name": "🏋️ Fitness Plan", "value": "You have a personalized fitness plan! Use `!fitnessplan` to view it.", "inline": False})
             
         # Add dietary preferences if available
         dietary_prefs = user_data.get('dietary_preferences', [])
         if dietary_prefs:
-            embed.add_field(name="🥗 Dietary Preferences", value=", ".join(dietary_prefs), inline=False)
+            fields.append({"name": "🥗 Dietary Preferences", "value": ", ".join(dietary_prefs), "inline": False})
             
-        # Add footer
-        embed.set_footer(text="Keep up the great work! 💪")
+        # Create stats embed in one pass from its dict form
+        embed = discord.Embed.from_dict({
+            "title": f"📊 Health Stats for {user_name}",
+            "description": "Here's your health journey progress!",
+            "color": 0x00ff00,
+            "fields": fields,
+            "footer": {"text": "Keep up the great work! 💪"},
+        })
         
         await message.channel.send(embed=embed)
         
-    async def process_dietary_command(self, message, args, user_id, user_name):
-        """Process the !dietary command to set dietary preferences"""
-        user_data = self.user_data_manager.get_user_data(user_id)
+    @staticmethod
+    def _get_epoch_timestamp(user_data, key):
+        """Get the epoch seconds stored next to an ISO timestamp field
         
-        # If no args, show current dietary preferences
-        if not args:
-            dietary_prefs = user_data.get('dietary_preferences', [])
-            
-            if not dietary_prefs:
-                await message.channel.send(f"""
-Hey {user_name}! 🥗 You don't have any dietary preferences set yet.
-
-**Why set dietary preferences?**
-- Ensures all food recommendations are safe for you
-- Helps find restaurants that accommodate your needs
-- Makes recipe suggestions more relevant
-
-To set your preferences, use: `!dietary vegetarian, gluten-free` (for example)
-
-Common dietary preferences:
-• vegetarian
-• vegan
-• gluten-free
-• dairy-free
-• nut-free
-• keto
-• paleo
-• low-carb
-• low-sodium
-• halal
-• kosher
-
-You can set multiple preferences by separating them with commas.
-""")
-            else:
-                prefs_list = ", ".join(dietary_prefs)
-                await message.channel.send(f"""
-Hey {user_name}! 🥗 Your current dietary preferences are: **{prefs_list}**
-
-These preferences are used to:
-1. Filter restaurant recommendations
-2. Customize recipe suggestions
-3. Ensure food recommendations are safe for you
-
-To update your preferences, use: `!dietary [new preferences]`
-To clear your preferences, use: `!dietary clear`
-""")
-            return
-            
-        # Clear preferences if requested
-        if args.lower() == "clear":
-            if 'dietary_preferences' in user_data:
-                del user_data['dietary_preferences']
-                self.user_data_manager.save_user_data(user_id, user_data)
-                await message.channel.send(f"✅ I've cleared your dietary preferences, {user_name}.")
-            else:
-                await message.channel.send(f"You don't have any dietary preferences set, {user_name}.")
-            return
-            
-        # Parse and set new preferences
-        preferences = [pref.strip().lower() for pref in args.split(',')]
-        
-        # Validate preferences
-        valid_preferences = []
-        for pref in preferences:
-            # Skip empty preferences
-            if not pref:
-                continue
-                
-            # Add the preference
-            valid_preferences.append(pref)
-            
-        if not valid_preferences:
-            await message.channel.send(f"Sorry {user_name}, I couldn't understand those dietary preferences. Please try again with preferences like 'vegetarian', 'gluten-free', etc.")
-            return
-            
-        # Update user data
-        user_data['dietary_preferences'] = valid_preferences
-        self.user_data_manager.save_user_data(user_id, user_data)
-        
-        # Confirm to user with personalized response
-        prefs_list = ", ".join(valid_preferences)
-        
-        # Create a more personalized confirmation based on the preferences
-        safety_message = ""
-        if any(pref in ["gluten-free", "nut-free", "dairy-free", "shellfish-free", "soy-free", "egg-free"] for pref in valid_preferences):
-            safety_message = "\n\n**Safety Note:** I'll ensure all food recommendations strictly avoid these allergens for your safety."
-        
-        lifestyle_message = ""
-        if any(pref in ["vegetarian", "vegan", "halal", "kosher"] for pref in valid_preferences):
-            lifestyle_message = "\n\n**Lifestyle Note:** I'll respect your dietary choices in all recommendations."
-        
-        health_message = ""
-        if any(pref in ["keto", "paleo", "low-carb", "low-sodium", "low-sugar", "low-fat"] for pref in valid_preferences):
-            health_message = "\n\n**Health Note:** I'll optimize recommendations to support your health goals."
+        Records written before the *_ts fields existed are parsed once and upgraded in place
+        """
+        ts_key = f"{key}_ts"
+        if ts_key not in user_data:
+            user_data[ts_key] = datetime.fromisoformat(user_data[key]).timestamp()
+        return user_data[ts_key]
         
-        await message.channel.send(f"""
-✅ Got it, {user_name}! I've updated your dietary preferences to: **{prefs_list}**
-
-All food recommendations, recipes, and restaurant suggestions will now respect these preferences.{safety_message}{lifestyle_message}{health_message}
-
-You can update these anytime with `!dietary [preferences]` or clear them with `!dietary clear`.
-""")
-        
-        # Save this conversation entry
-        self.save_conversation_entry(user_id, f"!dietary {args}", f"Set dietary preferences to: {prefs_list}")
-        
-    async def process_favorites_command(self, message, user_id, user_name):
+    async def process_favorites_command(self, message, args, user_id, user_name):
         """Process the !favorites command to show favorite restaurants and recipes"""
         # Get user data
         user_data = self.user_data_manager.get_user_data(user_id)
@@ -592,12 +952,19 @@ You can update these anytime with `!dietary [preferences]` or clear them with `!
         if 'favorites' not in user_data:
             user_data['favorites'] = {'restaurants': [], 'recipes': []}
             
-        if fav_type == 'restaurant':
-            if fav_name not in user_data['favorites']['restaurants']:
-                user_data['favorites']['restaurants'].append(fav_name)
-        else:  # recipe
-            if fav_name not in user_data['favorites']['recipes']:
-                user_data['favorites']['recipes'].append(fav_name)
+        # The list stays the stored, ordered form; the set answers membership in O(1)
+        fav_key = f"{fav_type}s"
+        fav_list = user_data['favorites'].setdefault(fav_key, [])
+        fav_set = self._favorite_sets.get((user_id, fav_key))
+        if fav_set is None:
+            # Evict the oldest set when full; it is rebuilt from the list on next use
+            if len(self._favorite_sets) >= FAVORITE_SETS_CACHE_SIZE:
+                self._favorite_sets.pop(next(iter(self._favorite_sets)))
+            fav_set = self._favorite_sets[(user_id, fav_key)] = set(fav_list)
+            
+        if fav_name not in fav_set:
+            fav_set.add(fav_name)
+            fav_list.append(fav_name)
                 
         self.user_data_manager.save_user_data(user_id, user_data)
         
@@ -633,7 +1000,7 @@ You can update these anytime with `!dietary [preferences]` or clear them with `!
         else:
             await message.channel.send(f"Hey {user_name}, I don't recognize that test type. Available tests: `activity`")
     
-    async def process_workout_command(self, message, user_id, user_name):
+    async def process_workout_command(self, message, args, user_id, user_name):
         """Process the !workout command"""
         # Create workout view
         workout_view = WorkoutView(self, user_id)
@@ -669,18 +1036,23 @@ Choose an option below:
         user_data['last_workout_message_id'] = sent_message.id
         
         # Update last workout time
-        user_data['last_workout_time'] = datetime.now().isoformat()
+        now = datetime.now()
+        user_data['last_workout_time'] = now.isoformat()
+        user_data['last_workout_time_ts'] = now.timestamp()
         
         # Save user data
         self.user_data_manager.save_user_data(user_id, user_data)
     
-    async def process_recipe_command(self, message, args, user_id, user_name):
-        """Process the !recipe command"""
-        if not args:
-            await message.channel.send(f"Hey {user_name}, please list some ingredients you have on hand. For example: `!recipe chicken, rice, broccoli`")
-            return
+    def _get_user_ctx(self, user_id):
+        """Get (health_goal, dietary_prefs, dietary_prefs_text) for a user's prompts
+        
+        The result is reused until a save that may have changed this user's data
+        """
+        version = self.user_data_manager.get_user_version(user_id)
+        cached = self._user_ctx_cache.get(user_id)
+        if cached and cached[0] == version:
+            return cached[1]
             
-        # Get user data for health goal and dietary preferences
         user_data = self.user_data_manager.get_user_data(user_id)
         health_goal_data = user_data.get('health_goal', {})
         
@@ -693,229 +1065,149 @@ Choose an option below:
         # Get dietary preferences
         dietary_prefs = user_data.get('dietary_preferences', [])
         dietary_prefs_text = ", ".join(dietary_prefs) if dietary_prefs else "None specified"
-            
-        # Create prompt for Mistral
-        prompt = f"""
-You are GG_Nourish, a nutrition assistant for gamers. You have a friendly, conversational tone and understand gaming culture well.
-
-USER CONTEXT:
-- Name: {user_name}
-- Health goal: {health_goal if health_goal else "Not specified"}
-- Dietary preferences/restrictions: {dietary_prefs_text}
-- Current query: "{args}"
-- Platform: Discord (gaming community)
-
-CONVERSATION HISTORY:
-{self.get_recent_conversation_context(user_id)}
-
-IMPORTANT SAFETY INSTRUCTION: You MUST strictly adhere to the user's dietary preferences and restrictions.
-If they have allergies or dietary restrictions, NEVER recommend foods that violate these restrictions.
-
-PERSONALITY INSTRUCTIONS:
-- Be conversational and natural - respond as if you're chatting with a friend
-- Use gaming references and terminology when appropriate
-- Show understanding of gaming-specific challenges (time constraints, need for focus, etc.)
-- Adapt your tone to match the user's energy level and style
-- Acknowledge previous interactions if relevant
-- Be helpful without being judgmental about food choices
-
-Provide personalized food recommendations that:
-1. Match their query
-2. Support their health goal (if specified)
-3. STRICTLY FOLLOW their dietary preferences/restrictions (this is critical for safety)
-4. Are suitable for gamers (easy to eat, not messy for keyboards/controllers)
-5. Include nutritional benefits specifically relevant to gaming performance (focus, energy, etc.)
-
-Keep your response concise but helpful. Address them by name and reference their specific situation.
-"""
-
-        try:
-            # Send a typing indicator while generating
-            async with message.channel.typing():
-                response = self.mistral_client.chat(
-                    model=MISTRAL_MODEL,
-                    messages=[
-                        {"role": "system", "content": prompt},
-                        {"role": "user", "content": args}
-                    ]
-                )
-                
-                recipe_response = response.choices[0].message.content
-                
-                # Split the response into chunks if it's too long for Discord
-                chunks = self.split_message(recipe_response)
-                
-                # Save this conversation entry
-                self.save_conversation_entry(user_id, f"!recipe {args}", recipe_response)
-                
-                # Send each chunk as a separate message
-                for i, chunk in enumerate(chunks):
-                    if i == 0:
-                        # Add a header to the first chunk
-                        await message.channel.send(f"**🍳 Here's your recipe, {user_name}!** {f'(Part {i+1}/{len(chunks)})' if len(chunks) > 1 else ''}\n\n{chunk}")
-                    else:
-                        # Add continuation header to subsequent chunks
-                        await message.channel.send(f"**Recipe continued** (Part {i+1}/{len(chunks)})\n\n{chunk}")
-                
-        except Exception as e:
-            logger.error(f"Error generating recipe: {e}")
-            await message.channel.send(f"Sorry {user_name}, I'm having trouble creating a recipe right now. Please try again later.")
-    
-    async def process_food_command(self, message, args, user_id, user_name):
-        """Process the !food command"""
-        if not args:
-            await message.channel.send(f"Hey {user_name}, please tell me what kind of food you're looking for. For example: `!food healthy breakfast ideas` or `!food quick protein snacks`")
-            return
-            
-        # Get user data for health goal and dietary preferences
-        user_data = self.user_data_manager.get_user_data(user_id)
-        health_goal_data = user_data.get('health_goal', {})
         
-        # Extract health goal text, handling both dictionary and string formats
-        if isinstance(health_goal_data, dict):
-            health_goal = health_goal_data.get('primary', '')
-        else:
-            health_goal = str(health_goal_data) if health_goal_data else ''
-            
-        # Get dietary preferences
-        dietary_prefs = user_data.get('dietary_preferences', [])
-        dietary_prefs_text = ", ".join(dietary_prefs) if dietary_prefs else "None specified"
-            
-        # Create prompt for Mistral
-        prompt = f"""
-You are GG_Nourish, a nutrition assistant for gamers. You have a friendly, conversational tone and understand gaming culture well.
-
-USER CONTEXT:
+        user_ctx = (health_goal, dietary_prefs, dietary_prefs_text)
+        self._user_ctx_cache[user_id] = (version, user_ctx)
+        return user_ctx
+    
+    def _get_cached_response(self, key):
+        """Get a cached Mistral response if it is still fresh"""
+        cached = self._response_cache.get(key)
+        if cached and time.monotonic() - cached[0] < RESPONSE_CACHE_TTL_SECONDS:
+            return cached[1]
+        return None
+    
+    def _cache_response(self, key, response):
+        """Cache a Mistral response, evicting the oldest entry when full"""
+        self._response_cache.pop(key, None)
+        if len(self._response_cache) >= RESPONSE_CACHE_SIZE:
+            self._response_cache.pop(next(iter(self._response_cache)))
+        self._response_cache[key] = (time.monotonic(), response)
+    
+    def _nutrition_user_context(self, user_id, user_name, health_goal, dietary_prefs_text, args):
+        """Render the per-request USER CONTEXT block of the !food / !recipe prompt"""
+        history = self.get_recent_conversation_context(user_id)
+        return f"""USER CONTEXT:
 - Name: {user_name}
 - Health goal: {health_goal if health_goal else "Not specified"}
 - Dietary preferences/restrictions: {dietary_prefs_text}
 - Current query: "{args}"
 - Platform: Discord (gaming community)
 
-CONVERSATION HISTORY:
-{self.get_recent_conversation_context(user_id)}
-
-IMPORTANT SAFETY INSTRUCTION: You MUST strictly adhere to the user's dietary preferences and restrictions.
-If they have allergies or dietary restrictions, NEVER recommend foods that violate these restrictions.
-
-PERSONALITY INSTRUCTIONS:
-- Be conversational and natural - respond as if you're chatting with a friend
-- Use gaming references and terminology when appropriate
-- Show understanding of gaming-specific challenges (time constraints, need for focus, etc.)
-- Adapt your tone to match the user's energy level and style
-- Acknowledge previous interactions if relevant
-- Be helpful without being judgmental about food choices
-
-Provide personalized food recommendations that:
-1. Match their query
-2. Support their health goal (if specified)
-3. STRICTLY FOLLOW their dietary preferences/restrictions (this is critical for safety)
-4. Are suitable for gamers (easy to eat, not messy for keyboards/controllers)
-5. Include nutritional benefits specifically relevant to gaming performance (focus, energy, etc.)
+CONVERSATION HISTORY:
+{history}
+
+"""
+    
+    def _fitness_user_context(self, user_id, user_name, health_goal, include_history=True):
+        """Render the per-request USER CONTEXT block of the !fitnessplan prompt"""
+        history = self.get_recent_conversation_context(user_id) if include_history else "No previous conversation history."
+        return f"""USER CONTEXT:
+- Name: {user_name}
+- Health goal: {health_goal}
+- Platform: Discord (gaming community)
+
+CONVERSATION HISTORY:
+{history}
 
-Keep your response concise but helpful. Address them by name and reference their specific situation.
 """
+    
+    async def process_recipe_command(self, message, args, user_id, user_name):
+        """Process the !recipe command"""
+        await self._process_nutrition_command('recipe', message, args, user_id, user_name)
+    
+    async def process_food_command(self, message, args, user_id, user_name):
+        """Process the !food command"""
+        await self._process_nutrition_command('food', message, args, user_id, user_name)
+    
+    async def _process_nutrition_command(self, kind, message, args, user_id, user_name):
+        """Answer a !recipe or !food query using the text for kind in NUTRITION_COMMANDS"""
+        spec = NUTRITION_COMMANDS[kind]
+        if not args:
+            await message.channel.send(spec['usage'].format(user_name=user_name))
+            return
+            
+        # Get health goal and dietary preferences
+        health_goal, dietary_prefs, dietary_prefs_text = self._get_user_ctx(user_id)
+            
+        # Repeated queries from the same profile reuse the earlier answer
+        cache_key = (kind, user_id, user_name, " ".join(args.lower().split()), health_goal, tuple(sorted(dietary_prefs)))
 
         try:
             # Send a typing indicator while generating
             async with message.channel.typing():
-                response = self.mistral_client.chat(
-                    model=MISTRAL_MODEL,
-                    messages=[
-                        {"role": "system", "content": prompt},
-                        {"role": "user", "content": args}
-                    ]
-                )
-                
-                food_response = response.choices[0].message.content
-                
-                # Split the response into chunks if it's too long for Discord
-                chunks = self.split_message(food_response)
+                header = spec['header'].format(user_name=user_name)
+                reply = self._get_cached_response(cache_key)
+                if reply is None:
+                    # Create prompt for Mistral and send the reply as it streams in
+                    user_context = self._nutrition_user_context(user_id, user_name, health_goal, dietary_prefs_text, args)
+                    pieces = self.mistral_chat_stream(
+                        model=MISTRAL_MODEL,
+                        messages=[
+                            {"role": "system", "content": NUTRITION_SYSTEM_PROMPT},
+                            {"role": "system", "content": user_context},
+                            {"role": "user", "content": args}
+                        ]
+                    )
+                    reply = await self.send_streamed_chunks(message.channel, pieces, header, spec['continued'])
+                    if not reply.strip():
+                        # Nothing was sent, so don't cache or save an empty answer
+                        await message.channel.send(f"Sorry {user_name}, I'm having trouble {spec['task']} right now. Please try again later.")
+                        return
+                    self._cache_response(cache_key, reply)
+                else:
+                    # Replay through the streaming sender so cached answers are split
+                    # and labelled exactly like fresh ones
+                    await self.send_streamed_chunks(message.channel, self._replay_pieces(reply), header, spec['continued'])
                 
                 # Save this conversation entry
-                self.save_conversation_entry(user_id, f"!food {args}", food_response)
-                
-                # Send each chunk as a separate message
-                for i, chunk in enumerate(chunks):
-                    if i == 0:
-                        # Add a header to the first chunk
-                        await message.channel.send(f"**🍔 Food recommendations for {user_name}** {f'(Part {i+1}/{len(chunks)})' if len(chunks) > 1 else ''}\n\n{chunk}")
-                    else:
-                        # Add continuation header to subsequent chunks
-                        await message.channel.send(f"**Recommendations continued** (Part {i+1}/{len(chunks)})\n\n{chunk}")
+                self.save_conversation_entry(user_id, f"!{kind} {args}", reply)
                 
         except Exception as e:
-            logger.error(f"Error generating food recommendations: {e}")
-            await message.channel.send(f"Sorry {user_name}, I'm having trouble generating food recommendations right now. Please try again later.")
+            logger.error(f"Error generating {spec['log_name']}: {e}")
+            await message.channel.send(f"Sorry {user_name}, I'm having trouble {spec['task']} right now. Please try again later.")
     
-    async def process_fitness_plan_command(self, message, user_id, user_name):
+    async def process_fitness_plan_command(self, message, args, user_id, user_name):
         """Process the !fitnessplan command to create a personalized fitness plan"""
         # Get user data for health goal
         user_data = self.user_data_manager.get_user_data(user_id)
-        health_goal_data = user_data.get('health_goal', {})
-        
-        # Extract health goal text, handling both dictionary and string formats
-        if isinstance(health_goal_data, dict):
-            health_goal = health_goal_data.get('primary', '')
-        else:
-            health_goal = str(health_goal_data) if health_goal_data else ''
+        health_goal, _, _ = self._get_user_ctx(user_id)
         
         if not health_goal:
             await message.channel.send(f"Hey {user_name}, before I can create a fitness plan for you, I need to know your health goal. Please set it with `!healthgoal [your goal]`")
             return
         
-        # Create prompt for Mistral
-        prompt = f"""
-You are GG_Nourish, a fitness and nutrition assistant for gamers. You have a friendly, conversational tone and understand gaming culture well.
-
-USER CONTEXT:
-- Name: {user_name}
-- Health goal: {health_goal}
-- Platform: Discord (gaming community)
-
-CONVERSATION HISTORY:
-{self.get_recent_conversation_context(user_id)}
-
-IMPORTANT SAFETY INSTRUCTION: You MUST strictly adhere to the user's health goals and preferences.
-If they have specific requirements or restrictions, NEVER recommend exercises that violate these restrictions.
-
-PERSONALITY INSTRUCTIONS:
-- Be conversational and natural - respond as if you're chatting with a friend
-- Use gaming references and terminology when appropriate
-- Show understanding of gaming-specific challenges (time constraints, need for focus, etc.)
-- Adapt your tone to match the user's energy level and style
-- Acknowledge previous interactions if relevant
-- Be helpful without being judgmental about their fitness level
-
-Create a personalized fitness plan that:
-1. Aligns with their health goal
-2. Is suitable for gamers who sit for long periods
-3. Includes exercises that can be done at home with minimal equipment
-4. Addresses common issues gamers face (wrist strain, back pain, eye fatigue)
-5. Can be broken down into short sessions that fit between gaming sessions
-
-Format your response conversationally, addressing them by name. Include:
-- A catchy name for their fitness plan
-- A brief introduction explaining the benefits of the plan
-- A weekly schedule with specific exercises
-- Tips for incorporating movement into gaming sessions
-- Stretches or exercises that can be done during loading screens or between matches
-
-Keep your response concise but helpful.
-"""
+        # Common goals share one generic plan per bucket with the name filled in
+        bucket = fitness_goal_bucket(health_goal)
 
         try:
             # Send a typing indicator while generating
             async with message.channel.typing():
-                response = self.mistral_client.chat(
-                    model=MISTRAL_MODEL,
-                    messages=[
-                        {"role": "system", "content": prompt},
-                        {"role": "user", "content": f"Create a fitness plan for me with my health goal: {health_goal}"}
-                    ]
-                )
+                template = None
+                cached = self._fitness_plan_templates.get(bucket) if bucket else None
+                if cached and time.monotonic() - cached[0] < FITNESS_PLAN_TEMPLATE_TTL_SECONDS:
+                    template = cached[1]
+                if template is None:
+                    # Create prompt for Mistral; bucket templates are asked for the bucket
+                    # itself and leave out the user's name, wording and history so they can be shared
+                    plan_goal = bucket or health_goal
+                    if bucket:
+                        user_context = self._fitness_user_context(user_id, FITNESS_PLAN_NAME_SLOT, plan_goal, include_history=False)
+                    else:
+                        user_context = self._fitness_user_context(user_id, user_name, plan_goal)
+                    response = await self.mistral_chat(
+                        model=MISTRAL_MODEL,
+                        messages=[
+                            {"role": "system", "content": FITNESS_SYSTEM_PROMPT},
+                            {"role": "system", "content": user_context},
+                            {"role": "user", "content": f"Create a fitness plan for me with my health goal: {plan_goal}"}
+                        ]
+                    )
+                    template = response.choices[0].message.content
+                    if bucket:
+                        self._fitness_plan_templates[bucket] = (time.monotonic(), template)
                 
-                fitness_plan = response.choices[0].message.content
+                fitness_plan = template.replace(FITNESS_PLAN_NAME_SLOT, user_name) if bucket else template
                 
                 # Split the response into chunks if it's too long for Discord
                 chunks = self.split_message(fitness_plan)
@@ -924,13 +1216,7 @@ Keep your response concise but helpful.
                 self.save_conversation_entry(user_id, "!fitnessplan", fitness_plan)
                 
                 # Send each chunk as a separate message
-                for i, chunk in enumerate(chunks):
-                    if i == 0:
-                        # Add a header to the first chunk
-                        await message.channel.send(f"**🏋️ Your Personalized Fitness Plan, {user_name}!** {f'(Part {i+1}/{len(chunks)})' if len(chunks) > 1 else ''}\n\n{chunk}")
-                    else:
-                        # Add continuation header to subsequent chunks
-                        await message.channel.send(f"**Fitness Plan continued** (Part {i+1}/{len(chunks)})\n\n{chunk}")
+                await self.send_chunks(message.channel, chunks, f"**🏋️ Your Personalized Fitness Plan, {user_name}!**", "**Fitness Plan continued**")
                 
                 # Add a reminder about the workout command
                 await message.channel.send(f"**Want to start a quick workout now?** Use `!workout` to begin a guided exercise session!")
@@ -947,73 +1233,111 @@ Keep your response concise but helpful.
             logger.error(f"Error generating fitness plan: {e}")
             await message.channel.send(f"Sorry {user_name}, I'm having trouble creating a fitness plan right now. Please try again later.")
     
+    @staticmethod
+    def _build_restaurant_embed(restaurant, health_goal, dietary_prefs, prefs_lower):
+        """Build the !order embed for one restaurant, highlighting dietary matches"""
+        # Create embed for restaurant
+        embed = discord.Embed(
+            title=f"🍽️ {restaurant['name']}",
+            description=f"**{restaurant['cuisine']}** • {restaurant['rating']}⭐ • ${restaurant['delivery_fee']} delivery • {restaurant['estimated_time']}",
+            color=0x00ff00
+        )
+        
+        # Add restaurant tags with emphasis on dietary compatibility
+        tags = ", ".join(restaurant['tags'])
+        if dietary_prefs:
+            # Highlight tags that match dietary preferences
+            highlighted_tags = []
+            for tag in restaurant['tags']:
+                tag_lower = tag.lower()
+                tag_matches_pref = any(pref in tag_lower for pref in prefs_lower)
+                if tag_matches_pref:
+                    highlighted_tags.append(f"**{tag}**")
+                else:
+                    highlighted_tags.append(tag)
+            tags = ", ".join(highlighted_tags)
+        
+        embed.add_field(name="Tags", value=tags, inline=False)
+        
+        # Add menu items if available
+        if 'menu_items' in restaurant:
+            menu_items = restaurant['menu_items']
+            if dietary_prefs:
+                menu_lines = []
+                for item in menu_items:
+                    # Add dietary compatibility indicator for each menu item
+                    dietary_compatible = True
+                    if 'tags' in item:
+                        # Check if item tags align with dietary preferences; one
+                        # newline-joined string means one substring scan per preference
+                        item_tags = "\n".join(item['tags']).lower()
+                        dietary_compatible = all(pref in item_tags for pref in prefs_lower)
+                    
+                    # Add a checkmark for items that match dietary preferences
+                    dietary_indicator = "✅ " if dietary_compatible else ""
+                    menu_lines.append(f"• {dietary_indicator}**{item['name']}** - ${item['price']}\n  {item['description']}\n")
+                menu_text = "".join(menu_lines)
+            else:
+                # Without preferences every item gets the checkmark, so skip the tag scan
+                menu_text = "".join(
+                    f"• ✅ **{item['name']}** - ${item['price']}\n  {item['description']}\n"
+                    for item in menu_items
+                )
+            
+            embed.add_field(name="🥗 Recommended Menu Items", value=menu_text, inline=False)
+        
+        # Add footer with health goal alignment and dietary safety
+        footer_text = f"These options align with your {health_goal} goal"
+        if dietary_prefs:
+            footer_text += f" and respect your dietary preferences ({', '.join(dietary_prefs)})"
+        embed.set_footer(text=footer_text)
+        return embed
+    
     async def process_order_command(self, message, args, user_id, user_name):
         """Process the !order command to find restaurants and order food"""
         if not args:
-            await message.channel.send(f"""
-Hey {user_name}! 🍽️ **Ready to order some healthy food?**
-
-To get restaurant recommendations based on your health goals and dietary preferences, use the `!order` command followed by your location:
-
-Example: `!order San Francisco` or `!order New York`
-
-**The food ordering workflow:**
-1. Set your health goal with `!healthgoal` (if you haven't already)
-2. Set any dietary restrictions with `!dietary` (if applicable)
-3. Use `!order [location]` to get restaurant recommendations that match your needs
-4. View the recommended restaurants and their healthy menu options
-
-**Note:** Your dietary preferences will be strictly respected in all recommendations for your safety.
-
-Try it now with: `!order [your location]`
-""")
+            await message.channel.send(ORDER_HELP_TEMPLATE.format(user_name=user_name))
             return
             
         location = args.strip()
         
-        # Get user data for health goal and dietary preferences
-        user_data = self.user_data_manager.get_user_data(user_id)
-        health_goal_data = user_data.get('health_goal', {})
-        
-        # Extract health goal text, handling both dictionary and string formats
-        if isinstance(health_goal_data, dict):
-            health_goal = health_goal_data.get('primary', '')
-        else:
-            health_goal = str(health_goal_data) if health_goal_data else ''
+        # Get health goal and dietary preferences
+        health_goal, dietary_prefs, _ = self._get_user_ctx(user_id)
         
         if not health_goal:
             await message.channel.send(f"Hey {user_name}, before I can recommend restaurants, I need to know your health goal. Please set it with `!healthgoal [your goal]`")
             return
-            
-        # Get dietary preferences
-        dietary_prefs = user_data.get('dietary_preferences', [])
+        
+        # Check if we're using the real API or mock data
+        using_real_api = not self.food_module.uber_eats_api.use_mock
+        
+        # Debug info about API usage
+        api_status = "real API" if using_real_api else "mock data"
+        logger.info("Restaurant search for %s using %s", location, api_status)
+        logger.info("Health goal: %s", health_goal)
+        logger.info("Dietary preferences: %s", dietary_prefs)
+        
+        # For mock data, let's ensure we're using a supported location format
+        if not using_real_api and location.lower() == "san francisco, ca":
+            # Try with just "San Francisco" for mock data
+            logger.info("Simplifying location for mock data")
+            location = "San Francisco"
+        
+        # Start the search before the typing indicator so its request overlaps
+        # the typing round trip to Discord
+        search_task = asyncio.create_task(self.food_module.uber_eats_api.search_restaurants(
+            location=location,
+            health_goal=health_goal,
+            dietary_preferences=dietary_prefs
+        ))
         
         # Get restaurant recommendations
         try:
             # Send a typing indicator while processing
             async with message.channel.typing():
-                # Check if we're using the real API or mock data
-                using_real_api = not self.food_module.uber_eats_api.use_mock
-                
-                # Debug info about API usage
-                api_status = "real API" if using_real_api else "mock data"
-                logger.info(f"Restaurant search for {location} using {api_status}")
-                logger.info(f"Health goal: {health_goal}")
-                logger.info(f"Dietary preferences: {dietary_prefs}")
-                
-                # For mock data, let's ensure we're using a supported location format
-                if not using_real_api and location.lower() == "san francisco, ca":
-                    # Try with just "San Francisco" for mock data
-                    logger.info("Simplifying location for mock data")
-                    location = "San Francisco"
-                
-                restaurants = await self.food_module.uber_eats_api.search_restaurants(
-                    location=location,
-                    health_goal=health_goal,
-                    dietary_preferences=dietary_prefs
-                )
+                restaurants = await search_task
                 
-                logger.info(f"Found {len(restaurants)} restaurants")
+                logger.debug("Found %d restaurants", len(restaurants))
                 
                 if not restaurants:
                     # Different error messages based on whether we're using the real API or mock data
@@ -1054,83 +1378,42 @@ Here are some healthy options for you:
 """
                 await message.channel.send(intro_message)
                 
-                # Send each restaurant as a separate message with embed for better formatting
-                for restaurant in restaurants[:3]:  # Limit to 3 restaurants to avoid spam
-                    # Create embed for restaurant
-                    embed = discord.Embed(
-                        title=f"🍽️ {restaurant['name']}",
-                        description=f"**{restaurant['cuisine']}** • {restaurant['rating']}⭐ • ${restaurant['delivery_fee']} delivery • {restaurant['estimated_time']}",
-                        color=0x00ff00
-                    )
-                    
-                    # Add restaurant tags with emphasis on dietary compatibility
-                    tags = ", ".join(restaurant['tags'])
-                    if dietary_prefs:
-                        # Highlight tags that match dietary preferences
-                        highlighted_tags = []
-                        for tag in restaurant['tags']:
-                            tag_matches_pref = any(pref.lower() in tag.lower() for pref in dietary_prefs)
-                            if tag_matches_pref:
-                                highlighted_tags.append(f"**{tag}**")
-                            else:
-                                highlighted_tags.append(tag)
-                        tags = ", ".join(highlighted_tags)
-                    
-                    embed.add_field(name="Tags", value=tags, inline=False)
-                    
-                    # Add menu items if available
-                    if 'menu_items' in restaurant:
-                        menu_items = restaurant['menu_items']
-                        menu_text = ""
-                        for item in menu_items:
-                            # Add dietary compatibility indicator for each menu item
-                            dietary_compatible = True
-                            if dietary_prefs and 'tags' in item:
-                                # Check if item tags align with dietary preferences
-                                item_tags = [tag.lower() for tag in item.get('tags', [])]
-                                for pref in dietary_prefs:
-                                    if not any(pref.lower() in tag for tag in item_tags):
-                                        dietary_compatible = False
-                                        break
-                            
-                            # Add a checkmark for items that match dietary preferences
-                            dietary_indicator = "✅ " if dietary_compatible else ""
-                            menu_text += f"• {dietary_indicator}**{item['name']}** - ${item['price']}\n  {item['description']}\n"
-                        
-                        embed.add_field(name="🥗 Recommended Menu Items", value=menu_text, inline=False)
-                    
-                    # Add footer with health goal alignment and dietary safety
-                    footer_text = f"These options align with your {health_goal} goal"
-                    if dietary_prefs:
-                        footer_text += f" and respect your dietary preferences ({', '.join(dietary_prefs)})"
-                    embed.set_footer(text=footer_text)
-                    
-                    await message.channel.send(embed=embed)
+                # Lowercase the preferences once for all tag checks below
+                prefs_lower = tuple(pref.lower() for pref in dietary_prefs)
+                
+                # Build an embed for each restaurant; they are sent in one message below
+                embeds = [
+                    self._build_restaurant_embed(restaurant, health_goal, dietary_prefs, prefs_lower)
+                    for restaurant in restaurants[:3]  # Limit to 3 restaurants to avoid spam
+                ]
+                
+                # One message carries all the embeds, so they keep their ranking and
+                # cost a single round trip
+                await message.channel.send(embeds=embeds)
                 
                 # Add a summary message
+                trailing_messages = []
                 if len(restaurants) > 3:
-                    await message.channel.send(f"...and {len(restaurants) - 3} more restaurants that match your preferences.")
+                    trailing_messages.append(f"...and {len(restaurants) - 3} more restaurants that match your preferences.")
                 
                 # Save this interaction for context
                 response_summary = f"Found {len(restaurants)} restaurants in {location} matching {health_goal} and dietary preferences: {dietary_prefs}"
                 self.save_conversation_entry(user_id, f"!order {location}", response_summary)
                 
                 # Personalized closing message based on time of day
-                current_hour = datetime.now().hour
-                if 5 <= current_hour < 11:
-                    meal_type = "breakfast"
-                elif 11 <= current_hour < 15:
-                    meal_type = "lunch"
-                elif 15 <= current_hour < 22:
-                    meal_type = "dinner"
-                else:
-                    meal_type = "late-night meal"
+                meal_type = MEAL_BY_HOUR[datetime.now().hour]
                 
-                await message.channel.send(f"Hope you find something delicious and healthy for your {meal_type}, {user_name}! 😋")
+                trailing_messages.append(f"Hope you find something delicious and healthy for your {meal_type}, {user_name}! 😋")
+                # Sent in order so the closing line follows the summary
+                for text in trailing_messages:
+                    await message.channel.send(text)
                 
         except Exception as e:
             logger.error(f"Error processing order command: {e}")
             await message.channel.send(f"Sorry {user_name}, I encountered an error while searching for restaurants. Please try again later.")
+        finally:
+            # Don't leave the search running if the typing indicator failed first
+            search_task.cancel()
     
     async def food_recommendations_button(self, interaction: discord.Interaction):
         """Button to get food recommendations"""
@@ -1143,126 +1426,29 @@ Here are some healthy options for you:
         )
         await interaction.followup.send(response.get('message'))
     
-    async def send_start_message(self, channel, user_id, user_name):
+    async def send_start_message(self, message, args, user_id, user_name):
         """Send a welcome message to start the user's health journey"""
-        start_message = """
-```
-╔════════════════════════════════════════════════════════════════════════════╗
-║                                                                            ║
-║                 WELCOME TO YOUR HEALTH JOURNEY!                            ║
-║                                                                            ║
-╚════════════════════════════════════════════════════════════════════════════╝
-```
-
-**Welcome to GG_Nourish, {user_name}!** 🎮 + 💪 = 🌟
-
-I'm your personal health assistant designed specifically for gamers. Let's start your journey to a healthier gaming lifestyle!
-
-**First Steps:**
-
-1️⃣ Set your health goal with `!healthgoal [your goal]`
-   Example: `!healthgoal I want to have more energy during gaming sessions`
-
-2️⃣ Explore healthy food options with `!food [preference]`
-   Example: `!food something quick and nutritious`
-
-3️⃣ Take a quick workout break with `!workout`
-   (These are designed to fit between gaming sessions!)
-
-**What Makes GG_Nourish Special:**
-• Activity monitoring that reminds you to take breaks
-• Personalized food and recipe recommendations
-• Quick workout routines designed for gamers
-• Progress tracking with `!stats`
-
-Ready to level up your health while gaming? Let's get started!
-"""
-        
-        await channel.send(start_message)
+        await message.channel.send(START_MESSAGE_TEMPLATE.format(user_name=user_name))
         
         # Update user data to mark that they've started
         user_data = self.user_data_manager.get_user_data(user_id)
         user_data['started'] = True
-        user_data['start_date'] = datetime.now().isoformat()
+        now = datetime.now()
+        user_data['start_date'] = now.isoformat()
+        user_data['start_date_ts'] = now.timestamp()
         self.user_data_manager.save_user_data(user_id, user_data)
         
-    async def send_help_message(self, channel, user_name):
+    async def send_help_message(self, message, args, user_id, user_name):
         """Send a help message with available commands"""
-        help_embed = discord.Embed(
-            title="🎮 GG_Nourish Commands 🥗",
-            description="Here are the commands you can use:",
-            color=discord.Color.green()
-        )
-        
-        help_embed.add_field(
-            name="Getting Started",
-            value=(
-                "`!start` - Begin your health journey\n"
-                "`!help` - Show this help message\n"
-                "`!stats` - View your progress and stats"
-            ),
-            inline=False
-        )
-        
-        help_embed.add_field(
-            name="Health Goals",
-            value=(
-                "`!healthgoal [goal]` - Set your health goal\n"
-                "Example: `!healthgoal I want to build muscle while gaming`"
-            ),
-            inline=False
-        )
-        
-        help_embed.add_field(
-            name="Dietary Preferences",
-            value=(
-                "`!diet` - View your current dietary preferences\n"
-                "`!diet [preferences]` - Set your dietary preferences\n"
-                "Example: `!diet vegetarian, gluten-free, no dairy`"
-            ),
-            inline=False
-        )
-        
-        help_embed.add_field(
-            name="Food & Nutrition",
-            value=(
-                "`!food [preference]` - Get food recommendations\n"
-                "`!recipe [ingredients]` - Generate a recipe\n"
-                "`!order [location]` - Find healthy restaurants near you"
-            ),
-            inline=False
-        )
-        
-        help_embed.add_field(
-            name="Fitness & Exercise",
-            value=(
-                "`!fitnessplan` - Get a personalized fitness plan\n"
-                "`!workout` - Start a quick workout break"
-            ),
-            inline=False
-        )
-        
-        help_embed.add_field(
-            name="Favorites",
-            value=(
-                "`!favorites` - View your favorites\n"
-                "`!addfavorite restaurant [name]` - Add a restaurant to favorites\n"
-                "`!addfavorite recipe [name]` - Add a recipe to favorites"
-            ),
-            inline=False
-        )
-        
-        help_embed.add_field(
-            name="Testing",
-            value=(
-                "`!test activity` - Simulate activity detection"
-            ),
-            inline=False
-        )
-        
-        help_embed.set_footer(text=f"GG_Nourish is here to help you stay healthy while gaming, {user_name}!")
+        help_embed = discord.Embed.from_dict({
+            "title": "🎮 GG_Nourish Commands 🥗",
+            "description": "Here are the commands you can use:",
+            "color": discord.Color.green().value,
+            "fields": list(HELP_EMBED_FIELDS),
+            "footer": {"text": f"GG_Nourish is here to help you stay healthy while gaming, {user_name}!"},
+        })
         
-        await channel.send(embed=help_embed)
+        await message.channel.send(embed=help_embed)
     
     async def process_dietary_command(self, message, args, user_id, user_name):
         """Process the diet command to set or view dietary preferences"""
@@ -1272,6 +1458,7 @@ Ready to level up your health while gaming? Let's get started!
         else:
             # With arguments, update dietary preferences
             response = await self.food_module.update_dietary_preferences(user_id, args)
+            self._invalidate_sysprompt(user_name)
             
         await message.channel.send(response.get('message'))
         
@@ -1280,27 +1467,68 @@ Ready to level up your health while gaming? Let's get started!
             view = DietaryPreferencesView(self, user_id)
             await message.channel.send("Would you like to add more details to your dietary preferences?", view=view)
         
+    def _forget_idle_users(self, recent_users):
+        """Drop the activity loop's cached state for users it no longer checks"""
+        recent = set(recent_users)
+        for user_id in self._session_starts.keys() - recent:
+            del self._session_starts[user_id]
+        # _seconds_since falls back to the stored epoch timestamps once a mark is gone
+        for mark in [mark for mark in self._activity_marks if mark[0] not in recent]:
+            del self._activity_marks[mark]
+        for user_id in self._warn_locks.keys() - recent:
+            del self._warn_locks[user_id]
+    
+    def _get_session_start(self, user_id, raw):
+        """Return the parsed session start, reparsing only when the stored string changes"""
+        cached = self._session_starts.get(user_id)
+        if cached and cached[0] == raw:
+            return cached[1]
+        session_start = datetime.fromisoformat(raw)
+        self._session_starts[user_id] = (raw, session_start)
+        return session_start
+    
+    def _seconds_since(self, user_id, activity_data, key, now_ts, now_mono):
+        """Get the seconds elapsed since the activity loop wrote an activity_data timestamp
+        
+        Uses the monotonic clock when this process wrote the value, so wall clock
+        adjustments cannot stall or skip the checks; falls back to the stored epoch after a restart
+        """
+        mark = self._activity_marks.get((user_id, key))
+        if mark is not None:
+            return now_mono - mark
+        return now_ts - self._get_epoch_timestamp(activity_data, key)
+    
     async def check_user_activity(self):
         """Check user activity and send reminders for breaks"""
         await self.wait_until_ready()
         logger.info("Starting activity monitoring task")
         
+        idle_interval = ACTIVITY_CHECK_INTERVAL_SECONDS
         while not self.is_closed():
+            active_users = 0
             try:
+                # Pick up activity that has not been flushed yet
+                self.apply_pending_activity()
+                
                 # Get all user data
                 all_user_data = self.user_data_manager.get_all_user_data()
                 
-                for user_id, user_data in all_user_data.items():
-                    # Skip if no activity data
-                    if 'activity_data' not in user_data:
-                        continue
-                        
-                    # Get the last activity time
-                    last_activity = self.user_data_manager.get_last_activity_time(user_id)
+                now = datetime.now()
+                now_ts = now.timestamp()
+                now_mono = time.monotonic()
+                today = now.strftime('%Y-%m-%d')
+                current_time = now.isoformat()
+                
+                # Only users with activity in the last hour need checking
+                recent_users = self.user_data_manager.get_recently_active_users(3600)
+                self._forget_idle_users(recent_users)
+                for user_id in recent_users:
+                    user_data = all_user_data.get(user_id)
                     
-                    # Skip if no activity in the last hour (user is not active)
-                    if not last_activity or (datetime.now() - last_activity).total_seconds() > 3600:
+                    # Skip if no activity data
+                    if not user_data or 'activity_data' not in user_data:
                         continue
+                    active_users += 1
                     
                     # Get activity data
                     activity_data = user_data['activity_data']
@@ -1311,65 +1539,39 @@ Ready to level up your health while gaming? Let's get started!
                         
                     # Calculate session duration
                     try:
-                        session_start = datetime.fromisoformat(activity_data['session_start'])
-                        session_duration = datetime.now() - session_start
+                        session_start = self._get_session_start(user_id, activity_data['session_start'])
+                        session_duration = now - session_start
                         session_minutes = session_duration.total_seconds() / 60
                     except (ValueError, TypeError):
                         continue
                     
-                    # Check if we need to send a warning
-                    today = datetime.now().strftime('%Y-%m-%d')
-                    
                     # Only update activity counter every minute (not every loop iteration)
                     # Get the last activity update time
                     last_update_time = activity_data.get('last_update_time')
-                    current_time = datetime.now().isoformat()
+                    daily = activity_data.setdefault('daily_activity', {})
+                    daily_activity = daily.get(today, 0)
                     
                     # Only increment activity if it's been at least 60 seconds since the last update
-                    if not last_update_time or (datetime.now() - datetime.fromisoformat(last_update_time)).total_seconds() >= 60:
-                        daily_activity = activity_data.get('daily_activity', {}).get(today, 0)
-                        
+                    if not last_update_time or self._seconds_since(user_id, activity_data, 'last_update_time', now_ts, now_mono) >= 60:
                         # Update daily activity (increment by 1 minute)
-                        if 'daily_activity' not in activity_data:
-                            activity_data['daily_activity'] = {}
-                        activity_data['daily_activity'][today] = daily_activity + 1
+                        if today not in daily:
+                            prune_daily_activity(daily, now)
+                        daily[today] = daily_activity + 1
                         
                         # Update the last update time
                         activity_data['last_update_time'] = current_time
+                        activity_data['last_update_time_ts'] = now_ts
+                        self._activity_marks[(user_id, 'last_update_time')] = now_mono
                         
                         # Save the updated activity data
                         self.user_data_manager.save_user_data(user_id, user_data)
                         
                         # Log activity update
-                        logger.debug(f"Updated activity for user {user_id}: {daily_activity + 1} minutes")
-                    else:
-                        # Get current daily activity without incrementing
-                        daily_activity = activity_data.get('daily_activity', {}).get(today, 0)
+                        logger.debug("Updated activity for user %s: %d minutes", user_id, daily_activity + 1)
                     
                     # Check if we need to send a warning
                     if daily_activity >= ACTIVITY_WARNING_THRESHOLD_MINUTES and not activity_data.get('warning_sent', False):
-                        # Send warning to the user
-                        try:
-                            user = await self.fetch_user(int(user_id))
-                            
-                            # Create workout view
-                            workout_view = WorkoutView(self, user_id)
-                            
-                            await user.send(
-                                f"⚠️ **HEALTH ALERT** ⚠️\n\n"
-                                f"You've been gaming for {daily_activity} minutes. Time for a quick health break!\n\n"
-                                f"Taking short breaks helps prevent eye strain, muscle fatigue, and improves your gaming performance.",
-                                view=workout_view
-                            )
-                            
-                            # Mark warning as sent and store the time
-                            activity_data['warning_sent'] = True
-                            activity_data['last_warning_time'] = datetime.now().isoformat()
-                            self.user_data_manager.save_user_data(user_id, user_data)
-                            
-                            logger.info(f"Sent activity warning to user {user_id}")
-                        except Exception as e:
-                            logger.error(f"Failed to send activity warning to user {user_id}: {e}")
+                        await self._send_activity_warning(user_id, user_data, daily_activity, current_time, now_ts, now_mono)
                     
                     # Only reset warning flag after the warning threshold has been reached again
                     # AND it's been at least 60 minutes since the last warning
@@ -1377,19 +1579,76 @@ Ready to level up your health while gaming? Let's get started!
                         last_warning_time = activity_data.get('last_warning_time')
                         
                         # If we have a last warning time and it's been at least 60 minutes
-                        if last_warning_time and (datetime.now() - datetime.fromisoformat(last_warning_time)).total_seconds() >= 3600:
+                        if last_warning_time and self._seconds_since(user_id, activity_data, 'last_warning_time', now_ts, now_mono) >= 3600:
                             logger.info(f"Resetting warning flag for user {user_id} after time threshold")
                             activity_data['warning_sent'] = False
+                            self._warn_locks.pop(user_id, None)
                             self.user_data_manager.save_user_data(user_id, user_data)
             
             except Exception as e:
                 logger.error(f"Error in activity monitoring task: {e}")
             
-            # Check every 30 seconds (more reasonable interval)
-            await asyncio.sleep(30)
-
+            # Check every minute while anyone is active, otherwise back off
+            # exponentially until a new message wakes the task up
+            if active_users:
+                idle_interval = ACTIVITY_CHECK_INTERVAL_SECONDS
+                interval = ACTIVITY_CHECK_INTERVAL_SECONDS
+            else:
+                interval = idle_interval
+                idle_interval = min(idle_interval * 2, ACTIVITY_CHECK_MAX_INTERVAL_SECONDS)
+            
+            self._activity_idle = not active_users
+            self._activity_wakeup.clear()
+            try:
+                await asyncio.wait_for(self._activity_wakeup.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
+            self._activity_idle = False
+
+    async def _send_activity_warning(self, user_id, user_data, daily_activity, current_time, now_ts, now_mono):
+        """DM a user a health break warning with a workout, at most once until the flag resets"""
+        activity_data = user_data['activity_data']
+        async with self._warn_locks.setdefault(user_id, asyncio.Lock()):
+            # Another pass may have warned the user while this one waited for the lock
+            if activity_data.get('warning_sent', False):
+                return
+            try:
+                user = await self.fetch_user(int(user_id))
+                
+                # Create workout view
+                workout_view = WorkoutView(self, user_id)
+                
+                await user.send(
+                    f"⚠️ **HEALTH ALERT** ⚠️\n\n"
+                    f"You've been gaming for {daily_activity} minutes. Time for a quick health break!\n\n"
+                    f"Taking short breaks helps prevent eye strain, muscle fatigue, and improves your gaming performance.",
+                    view=workout_view
+                )
+                
+                # Mark warning as sent and store the time
+                activity_data['warning_sent'] = True
+                activity_data['last_warning_time'] = current_time
+                activity_data['last_warning_time_ts'] = now_ts
+                self._activity_marks[(user_id, 'last_warning_time')] = now_mono
+                self.user_data_manager.save_user_data(user_id, user_data)
+                
+                logger.info(f"Sent activity warning to user {user_id}")
+            except Exception as e:
+                logger.error(f"Failed to send activity warning to user {user_id}: {e}")
+    
     def get_recent_conversation_context(self, user_id):
-        """Get recent conversation history for a user to provide context to the AI"""
+        """Get recent conversation history for a user to provide context to the AI
+        
+        save_conversation_entry is the only writer of the history and formats the
+        context as it saves, so only the first read after startup formats it here
+        """
+        context = self._ctx_cache.get(user_id)
+        if context is None:
+            context = self._ctx_cache[user_id] = self._format_conversation_context(user_id)
+        return context
+        
+    def _format_conversation_context(self, user_id):
+        """Format the last few conversation entries for a prompt"""
         user_data = self.user_data_manager.get_user_data(user_id)
         
         # Initialize conversation history if it doesn't exist
@@ -1398,17 +1657,19 @@ Ready to level up your health while gaming? Let's get started!
             return "No previous conversation history."
         
         # Get the last 5 interactions (or fewer if there aren't that many)
-        recent_history = user_data['conversation_history'][-5:] if len(user_data['conversation_history']) > 5 else user_data['conversation_history']
+        recent_history = user_data['conversation_history'][-5:]
         
         if not recent_history:
             return "No previous conversation history."
             
-        # Format the conversation history
+        # Format the conversation history, truncating long responses to 150 characters
         formatted_history = []
         for entry in recent_history:
             if 'command' in entry and 'response' in entry:
-                formatted_history.append(f"User command: {entry['command']}")
-                formatted_history.append(f"Your response: {entry['response'][:150]}..." if len(entry['response']) > 150 else f"Your response: {entry['response']}")
+                response = entry['response']
+                if len(response) > 150:
+                    response = f"{response[:150]}..."
+                formatted_history.append(f"User command: {entry['command']}\nYour response: {response}")
         
         return "\n".join(formatted_history) if formatted_history else "No previous conversation history."
         
@@ -1417,52 +1678,229 @@ Ready to level up your health while gaming? Let's get started!
         user_data = self.user_data_manager.get_user_data(user_id)
         
         # Initialize conversation history if it doesn't exist
-        if 'conversation_history' not in user_data:
-            user_data['conversation_history'] = []
+        history = user_data.setdefault('conversation_history', [])
         
         # Add the new entry
-        user_data['conversation_history'].append({
+        history.append({
             'timestamp': datetime.now().isoformat(),
             'command': command,
             'response': response
         })
         
-        # Limit history to last 20 interactions to prevent excessive memory usage
-        if len(user_data['conversation_history']) > 20:
-            user_data['conversation_history'] = user_data['conversation_history'][-20:]
+        # Limit history to last 20 interactions to prevent excessive memory usage;
+        # trimming in place avoids copying the list on every save
+        if len(history) > 20:
+            del history[:-20]
+        
+        # Format the prompt context now so prompt builds never have to
+        self._ctx_cache[user_id] = self._format_conversation_context(user_id)
         
         # Save the updated user data
         self.user_data_manager.save_user_data(user_id, user_data)
 
+    async def send_streamed_chunks(self, channel, pieces, first_header, continued_header):
+        """Send streamed text as it arrives, cutting at paragraph or line breaks
+        
+        Returns the full text so the caller can cache and save it; nothing is
+        sent when the text is empty or only whitespace
+        """
+        received = []
+        pending = []
+        pending_len = 0
+        header = first_header
+        async for piece in pieces:
+            received.append(piece)
+            pending.append(piece)
+            pending_len += len(piece)
+            if pending_len < STREAM_CHUNK_MIN_CHARS:
+                continue
+            # Join only once enough text is pending to send a message
+            buf = "".join(pending)
+            while len(buf) >= STREAM_CHUNK_MIN_CHARS:
+                end = buf.rfind("\n\n", 0, 1900)
+                if end <= 0:
+                    end = buf.rfind("\n", 0, 1900)
+                if end <= 0:
+                    if len(buf) < 1900:
+                        break
+                    end = 1900
+                await channel.send(f"{header}\n\n{buf[:end]}")
+                header = continued_header
+                buf = buf[end:].lstrip("\n")
+            pending = [buf]
+            pending_len = len(buf)
+        buf = "".join(pending)
+        if buf.strip():
+            await channel.send(f"{header}\n\n{buf}")
+        return "".join(received)
+    
+    @staticmethod
+    async def _replay_pieces(text):
+        """Yield stored text as a single stream piece"""
+        yield text
+    
+    async def send_chunks(self, channel, chunks, first_header, continued_header):
+        """Send response chunks in order, numbering the parts when there is more than one"""
+        total = len(chunks)
+        if total == 1:
+            await channel.send(f"{first_header}\n\n{chunks[0]}")
+            return
+        for i, chunk in enumerate(chunks, 1):
+            header = first_header if i == 1 else continued_header
+            await channel.send(f"{header} (Part {i}/{total})\n\n{chunk}")
+
+    @staticmethod
+    def _split_1900(text):
+        """Slice text into windows of at most 1900 characters, breaking at a newline when one is available"""
+        parts = []
+        start = 0
+        while len(text) - start > 1900:
+            end = text.rfind("\n", start, start + 1900)
+            if end <= start:
+                end = start + 1900
+            parts.append(text[start:end])
+            start = end
+        parts.append(text[start:])
+        return parts
+
     def split_message(self, message, max_length=1900):
         """Split a long message into smaller chunks that fit within Discord's character limit"""
         # If the message is already short enough, return it as a single chunk
         if len(message) <= max_length:
             return [message]
             
-        # Split by paragraphs (double newlines)
+        # Split by paragraphs (double newlines), collecting each chunk's
+        # paragraphs in a list and joining once
         chunks = []
-        current_chunk = ""
-        paragraphs = message.split("\n\n")
-        
-        for paragraph in paragraphs:
-            # If adding this paragraph would exceed the limit, start a new chunk
-            if len(current_chunk) + len(paragraph) + 2 > max_length:
-                if current_chunk:  # Only add non-empty chunks
-                    chunks.append(current_chunk)
-                current_chunk = paragraph
-            else:
-                if current_chunk:
-                    current_chunk += "\n\n" + paragraph
+        current_chunk = []
+        current_length = 0
+        
+        for paragraph in message.split("\n\n"):
+            # A paragraph that alone exceeds the limit is sliced at line breaks
+            pieces = self._split_1900(paragraph) if len(paragraph) > max_length else (paragraph,)
+            for piece in pieces:
+                # If adding this piece would exceed the limit, start a new chunk
+                if current_length + len(piece) + 2 > max_length:
+                    if current_length:  # Only add non-empty chunks
+                        chunks.append("\n\n".join(current_chunk))
+                    current_chunk = [piece]
+                    current_length = len(piece)
+                elif current_length:
+                    current_chunk.append(piece)
+                    current_length += len(piece) + 2
                 else:
-                    current_chunk = paragraph
+                    current_chunk = [piece]
+                    current_length = len(piece)
         
         # Add the last chunk if it's not empty
-        if current_chunk:
-            chunks.append(current_chunk)
+        if current_length:
+            chunks.append("\n\n".join(current_chunk))
             
         return chunks
 
+    # Command name -> handler; every handler takes (message, args, user_id, user_name)
+    COMMAND_TABLE = {
+        'help': send_help_message,
+        'start': send_start_message,
+        'healthgoal': process_health_goal_command,
+        'stats': process_stats_command,
+        'food': process_food_command,
+        'recipe': process_recipe_command,
+        'fitnessplan': process_fitness_plan_command,
+        'workout': process_workout_command,
+        'order': process_order_command,
+        'diet': process_dietary_command,
+        'dietary': process_dietary_command,
+        'addfavorite': process_add_favorite_command,
+        'favorites': process_favorites_command,
+        'test': process_test_command,
+    }
+
+# Exercises in the guided Discord workout; shared by every WorkoutView
+WORKOUT_EXERCISES = (
+    {
+        "name": "Neck Stretches",
+        "duration": 60,  # seconds
+        "description": "Gently tilt your head side to side and front to back",
+        "benefit": "Relieves neck tension from looking at the screen"
+    },
+    {
+        "name": "Shoulder Rolls",
+        "duration": 60,
+        "description": "Roll your shoulders backward and forward",
+        "benefit": "Reduces shoulder stiffness from keyboard use"
+    },
+    {
+        "name": "Wrist Stretches",
+        "duration": 60,
+        "description": "Extend your arms and gently bend your wrists in all directions",
+        "benefit": "Prevents carpal tunnel and wrist strain"
+    },
+    {
+        "name": "Eye Relief",
+        "duration": 60,
+        "description": "Look away from the screen and focus on objects at different distances",
+        "benefit": "Reduces eye strain and prevents dry eyes"
+    },
+    {
+        "name": "Standing Side Bends",
+        "duration": 60,
+        "description": "Stand up and bend side to side with arms overhead",
+        "benefit": "Stretches your sides and improves posture"
+    },
+    {
+        "name": "Seated Leg Extensions",
+        "duration": 60,
+        "description": "While seated, extend each leg straight out and hold",
+        "benefit": "Improves circulation in your legs"
+    },
+    {
+        "name": "Desk Push-ups",
+        "duration": 60,
+        "description": "Do push-ups against your desk at an angle",
+        "benefit": "Activates chest and arm muscles"
+    },
+    {
+        "name": "Chair Squats",
+        "duration": 60,
+        "description": "Stand up and sit down repeatedly without fully sitting",
+        "benefit": "Strengthens leg muscles and improves circulation"
+    },
+    {
+        "name": "Deep Breathing",
+        "duration": 60,
+        "description": "Take deep breaths, filling your lungs completely and exhaling slowly",
+        "benefit": "Increases oxygen flow and reduces stress"
+    },
+    {
+        "name": "Final Stretch",
+        "duration": 60,
+        "description": "Reach up high, then touch your toes, and finally twist side to side",
+        "benefit": "Full-body stretch to finish your workout"
+    },
+)
+
+# Workout progress bars indexed by the number of filled cells
+WORKOUT_PROGRESS_BAR_LENGTH = 20
+WORKOUT_PROGRESS_BARS = tuple(
+    "▓" * filled + "░" * (WORKOUT_PROGRESS_BAR_LENGTH - filled) for filled in range(WORKOUT_PROGRESS_BAR_LENGTH + 1)
+)
+
+# Shown when the guided workout finishes
+WORKOUT_COMPLETE_EMBED = {
+    "title": "🎉 Workout Complete!",
+    "description": "Great job! You've completed your 10-minute workout break.",
+    "color": discord.Color.green().value,
+    "fields": (
+        {
+            "name": "Benefits",
+            "value": "• Reduced eye strain and muscle tension\n• Improved circulation and energy\n• Enhanced focus for your next gaming session",
+            "inline": False,
+        },
+    ),
+    "footer": {"text": "Remember to take regular breaks during long gaming sessions!"},
+}
+
 # Custom UI Components
 class WorkoutView(discord.ui.View):
     """View for workout options"""
@@ -1475,70 +1913,18 @@ class WorkoutView(discord.ui.View):
         self.remaining_seconds = 0
         self.is_paused = False
         self.workout_message = None
+        # Message carrying this view's buttons, re-rendered when the workout ends
+        self._parent_message = None
+        # Loop time at which the current exercise ends; remaining_seconds is
+        # derived from it on each redraw and frozen while paused
+        self._exercise_end = None
+        self._unpaused = asyncio.Event()
+        self._unpaused.set()
+        # (exercise index, seconds remaining) last drawn, to skip edits that change nothing
+        self._last_rendered = None
         
         # Define the workout exercises
-        self.exercises = [
-            {
-                "name": "Neck Stretches",
-                "duration": 60,  # seconds
-                "description": "Gently tilt your head side to side and front to back",
-                "benefit": "Relieves neck tension from looking at the screen"
-            },
-            {
-                "name": "Shoulder Rolls",
-                "duration": 60,
-                "description": "Roll your shoulders backward and forward",
-                "benefit": "Reduces shoulder stiffness from keyboard use"
-            },
-            {
-                "name": "Wrist Stretches",
-                "duration": 60,
-                "description": "Extend your arms and gently bend your wrists in all directions",
-                "benefit": "Prevents carpal tunnel and wrist strain"
-            },
-            {
-                "name": "Eye Relief",
-                "duration": 60,
-                "description": "Look away from the screen and focus on objects at different distances",
-                "benefit": "Reduces eye strain and prevents dry eyes"
-            },
-            {
-                "name": "Standing Side Bends",
-                "duration": 60,
-                "description": "Stand up and bend side to side with arms overhead",
-                "benefit": "Stretches your sides and improves posture"
-            },
-            {
-                "name": "Seated Leg Extensions",
-                "duration": 60,
-                "description": "While seated, extend each leg straight out and hold",
-                "benefit": "Improves circulation in your legs"
-            },
-            {
-                "name": "Desk Push-ups",
-                "duration": 60,
-                "description": "Do push-ups against your desk at an angle",
-                "benefit": "Activates chest and arm muscles"
-            },
-            {
-                "name": "Chair Squats",
-                "duration": 60,
-                "description": "Stand up and sit down repeatedly without fully sitting",
-                "benefit": "Strengthens leg muscles and improves circulation"
-            },
-            {
-                "name": "Deep Breathing",
-                "duration": 60,
-                "description": "Take deep breaths, filling your lungs completely and exhaling slowly",
-                "benefit": "Increases oxygen flow and reduces stress"
-            },
-            {
-                "name": "Final Stretch",
-                "duration": 60,
-                "description": "Reach up high, then touch your toes, and finally twist side to side",
-                "benefit": "Full-body stretch to finish your workout"
-            }
-        ]
+        self.exercises = WORKOUT_EXERCISES
     
     @discord.ui.button(label="Start 10-Min Workout", style=discord.ButtonStyle.primary, emoji="🏋️")
     async def start_workout_button(self, interaction: discord.Interaction, button: discord.ui.Button):
@@ -1555,6 +1941,7 @@ class WorkoutView(discord.ui.View):
             
             # Update the view
             await interaction.response.edit_message(view=self)
+            self._parent_message = interaction.message
             
             # Create the initial workout embed
             embed = await self.create_workout_embed()
@@ -1584,12 +1971,18 @@ class WorkoutView(discord.ui.View):
     @discord.ui.button(label="Pause", style=discord.ButtonStyle.secondary, emoji="⏸️", disabled=True)
     async def pause_button(self, interaction: discord.Interaction, button: discord.ui.Button):
         """Pause the workout timer"""
+        loop = asyncio.get_running_loop()
         if not self.is_paused:
             self.is_paused = True
+            if self._exercise_end is not None:
+                self.remaining_seconds = max(0, round(self._exercise_end - loop.time()))
+            self._unpaused.clear()
             button.label = "Resume"
             button.emoji = "▶️"
         else:
             self.is_paused = False
+            self._exercise_end = loop.time() + self.remaining_seconds
+            self._unpaused.set()
             button.label = "Pause"
             button.emoji = "⏸️"
         
@@ -1663,11 +2056,8 @@ class WorkoutView(discord.ui.View):
         total_exercises = len(self.exercises)
         progress = int((self.current_exercise_index / total_exercises) * 100)
         
-        # Create progress bar
-        progress_bar = ""
-        bar_length = 20
-        filled_length = int(bar_length * progress / 100)
-        progress_bar = "▓" * filled_length + "░" * (bar_length - filled_length)
+        # Look up the progress bar
+        progress_bar = WORKOUT_PROGRESS_BARS[int(WORKOUT_PROGRESS_BAR_LENGTH * progress / 100)]
         
         embed = discord.Embed(
             title=f"🏋️ GG_Nourish Workout - Exercise {self.current_exercise_index + 1}/{total_exercises}",
@@ -1709,56 +2099,60 @@ class WorkoutView(discord.ui.View):
         return embed
     
     async def run_timer(self):
-        """Run the workout timer"""
+        """Run the workout timer
+        
+        The embed is redrawn every WORKOUT_TIMER_UPDATE_SECONDS and when an
+        exercise ends, with the time remaining computed from the exercise deadline
+        """
+        loop = asyncio.get_running_loop()
+        self._exercise_end = loop.time() + self.remaining_seconds
         try:
             while self.current_exercise_index < len(self.exercises):
-                if not self.is_paused:
-                    # Update the timer
-                    if self.remaining_seconds > 0:
-                        self.remaining_seconds -= 1
-                    else:
-                        # Move to the next exercise
-                        self.current_exercise_index += 1
+                if self.is_paused:
+                    # pause_button froze remaining_seconds and resets the deadline on resume
+                    await self._unpaused.wait()
+                    continue
+                    
+                # Update the timer
+                remaining = self._exercise_end - loop.time()
+                if remaining > 0:
+                    self.remaining_seconds = round(remaining)
+                else:
+                    # Move to the next exercise
+                    self.current_exercise_index += 1
+                    
+                    # Check if workout is complete
+                    if self.current_exercise_index >= len(self.exercises):
+                        # Workout complete
+                        embed = discord.Embed.from_dict({
+                            **WORKOUT_COMPLETE_EMBED,
+                            "fields": list(WORKOUT_COMPLETE_EMBED["fields"]),
+                        })
+                        await self.workout_message.edit(embed=embed)
+                        
+                        # Disable all buttons
+                        self.pause_button.disabled = True
+                        self.stop_button.disabled = True
                         
-                        # Check if workout is complete
-                        if self.current_exercise_index >= len(self.exercises):
-                            # Workout complete
-                            embed = discord.Embed(
-                                title="🎉 Workout Complete!",
-                                description="Great job! You've completed your 10-minute workout break.",
-                                color=discord.Color.green()
-                            )
-                            
-                            embed.add_field(
-                                name="Benefits",
-                                value="• Reduced eye strain and muscle tension\n• Improved circulation and energy\n• Enhanced focus for your next gaming session",
-                                inline=False
-                            )
-                            
-                            embed.set_footer(text="Remember to take regular breaks during long gaming sessions!")
-                            
-                            await self.workout_message.edit(embed=embed)
-                            
-                            # Disable all buttons
-                            self.pause_button.disabled = True
-                            self.stop_button.disabled = True
-                            
-                            # Update the original message view
-                            for interaction in self._view_children:
-                                if hasattr(interaction, "message") and interaction.message:
-                                    await interaction.message.edit(view=self)
-                            
-                            break
+                        # Update the original message view
+                        if self._parent_message:
+                            await self._parent_message.edit(view=self)
                         
-                        # Set timer for the next exercise
-                        self.remaining_seconds = self.exercises[self.current_exercise_index]["duration"]
+                        break
                     
-                    # Update the embed
+                    # Set timer for the next exercise
+                    self.remaining_seconds = self.exercises[self.current_exercise_index]["duration"]
+                    self._exercise_end = loop.time() + self.remaining_seconds
+                
+                # Update the embed when what it shows has changed
+                rendered = (self.current_exercise_index, self.remaining_seconds)
+                if rendered != self._last_rendered:
                     embed = await self.create_workout_embed()
                     await self.workout_message.edit(embed=embed)
+                    self._last_rendered = rendered
                 
-                # Wait for 1 second
-                await asyncio.sleep(1)
+                # Sleep until the next redraw or the end of the exercise, whichever is first
+                await asyncio.sleep(max(0, min(WORKOUT_TIMER_UPDATE_SECONDS, self._exercise_end - loop.time())))
                 
         except asyncio.CancelledError:
             logger.info(f"Workout timer cancelled for user {self.user_id}")
@@ -1827,7 +2221,7 @@ class SpiceLevelSelect(discord.ui.Select):
         
         # Add spice preference to user data
         user_data['spice_preference'] = self.values[0]
-        self.agent.user_data_manager.save_user_data()
+        self.agent.user_data_manager.save_user_data(self.user_id, user_data)
         
         await interaction.response.send_message(
             f"Great! I've set your spice preference to **{self.values[0]}**. I'll consider this when recommending food."
@@ -1857,7 +2251,7 @@ class FavoriteCuisinesModal(discord.ui.Modal):
         
         # Add cuisines to user data
         user_data['favorite_cuisines'] = cuisine_list
-        self.agent.user_data_manager.save_user_data()
+        self.agent.user_data_manager.save_user_data(self.user_id, user_data)
         
         await interaction.response.send_message(
             f"Thanks! I've saved your favorite cuisines: **{', '.join(cuisine_list)}**. I'll consider these in my recommendations."
@@ -1898,7 +2292,7 @@ class AllergiesModal(discord.ui.Modal):
             if formatted_allergy not in user_data['dietary_restrictions']:
                 user_data['dietary_restrictions'].append(formatted_allergy)
         
-        self.agent.user_data_manager.save_user_data()
+        self.agent.user_data_manager.save_user_data(self.user_id, user_data)
         
         await interaction.response.send_message(
             f"Thanks for letting me know about your allergies: **{', '.join(allergy_list)}**. I'll make sure to avoid these in food recommendations and recipes."
@@ -1914,6 +2308,10 @@ def run_bot():
         print("Error: DISCORD_TOKEN not found in environment variables")
         return
         
+    # Switch the event loop before client.run creates one
+    if uvloop is not None:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        
     # Create and run the bot
     client = GGNourishAgent()
     client.run(token)
@@ -1,83 +1,102 @@
+import asyncio
 import json
 import os
 import logging
+import re
+import time
 from datetime import datetime
 from mistralai.client import MistralClient
 
+try:
+    # json5 tolerates trailing commas and comments, but is far slower, so it is only a fallback
+    import json5
+except ImportError:
+    json5 = None
+
 # Constants
 MISTRAL_MODEL = "mistral-medium"  # Using medium model for faster responses
 ACTIVITY_REMINDER_THRESHOLD = 60  # 1 minute in seconds (for testing)
+PLAN_CACHE_SIZE = 1024
+PLAN_CACHE_TTL_SECONDS = 86400  # Plans only depend on the goal, restrictions and exercise type
 
 logger = logging.getLogger("fitness_module")
 
-class FitnessModule:
-    def __init__(self, mistral_client, user_data_manager):
-        """Initialize the fitness module with required dependencies"""
-        self.mistral_client = mistral_client
-        self.user_data_manager = user_data_manager
-        
-    async def create_fitness_plan(self, user_id):
-        """Create a dynamic fitness plan aligned with the user's health goal"""
-        user_data = self.user_data_manager.get_user_data(user_id)
-        health_goal = user_data.get('health_goal', {})
-        
-        if not health_goal:
-            return {
-                "success": False,
-                "message": "I need to understand your health goal first. Can you tell me what your health goal is?"
-            }
-            
-        if not self.mistral_client:
-            return {
-                "success": False,
-                "message": "Sorry, I'm having trouble connecting to my AI brain right now."
-            }
-        
-        # Get dietary preferences if available
-        dietary_preferences = user_data.get('dietary_preferences', {})
-        diet_restrictions = []
-        allergies = []
-        diets = []
-        
-        if dietary_preferences:
-            if 'allergies' in dietary_preferences:
-                allergies = dietary_preferences['allergies']
-                diet_restrictions.extend(allergies)
-            if 'diets' in dietary_preferences:
-                diets = dietary_preferences['diets']
-                diet_restrictions.extend(diets)
-                
-        # Log dietary restrictions for context
-        if diet_restrictions:
-            logger.info(f"Including dietary restrictions in fitness plan for user {user_id}: {diet_restrictions}")
-            
-        # Create system message for Mistral
-        system_message = f"""You are GG_Nourish, a health and nutrition assistant for gamers.
+# From the first "{" to the last "}" of a reply, ignoring code fences and commentary around it
+_JSON_OBJECT_RE = re.compile(r"\{.*\}", re.DOTALL)
+
+# Cheap gaming-session detection; only messages these can't settle go to Mistral.
+# Titles that are also everyday words ("cod", "league") only count as hints.
+_GAME_TITLES = r"fortnite|valorant|apex(?: legends)?|league of legends|call of duty|minecraft|overwatch|dota|cs2|rocket league"
+_GAME_TITLE_RE = re.compile(r"\b(?:" + _GAME_TITLES + r")\b", re.IGNORECASE)
+_GAMING_START_CUES = r"gonna play|going to play|about to play|time for|starting|jumping into|hopping on|queueing|queuing"
+_GAMING_END_CUES = r"done|finished|quitting|logging off|enough|break from"
+# A game title or "gaming"/"game" right after the cue, allowing a few filler words
+_GAMING_NOUN = (
+    r"\s+(?:(?:some|a|an|my|more|with|playing)\s+)*(?:\d+[- ]hours?\s+)?"
+    r"(?:" + _GAME_TITLES + r"|gaming|games?)\b"
+)
+_GAMING_START_RE = re.compile(r"\b(?:" + _GAMING_START_CUES + r")" + _GAMING_NOUN, re.IGNORECASE)
+_GAMING_END_RE = re.compile(r"\b(?:" + _GAMING_END_CUES + r")" + _GAMING_NOUN, re.IGNORECASE)
+_GAMING_START_CUE_RE = re.compile(r"\b(?:" + _GAMING_START_CUES + r")\b", re.IGNORECASE)
+_GAMING_END_CUE_RE = re.compile(r"\b(?:" + _GAMING_END_CUES + r")\b", re.IGNORECASE)
+_NEGATION_RE = re.compile(r"\b(?:not|never|no)\b|n't\b", re.IGNORECASE)
+_GAMING_HINT_RE = re.compile(
+    r"\b(?:" + _GAME_TITLES + r"|cod|league|gam(?:e|es|ing|er)|play(?:ing)?|stream(?:ing)?|match|ranked|queue|lobby|session)\b",
+    re.IGNORECASE
+)
+
+# Static parts of the system prompts; the headers take str.format slots for the
+# user's goal, and the rules/schema suffixes are sent unchanged
+DIETARY_RESTRICTIONS_HEADING = "**DIETARY RESTRICTIONS - CRITICALLY IMPORTANT:**\n"
+
+FITNESS_PLAN_HEADER = """You are GG_Nourish, a health and nutrition assistant for gamers.
 Your task is to create a personalized fitness plan that aligns with the user's health goal.
 
-User's primary health goal: {health_goal.get('primary', 'Not specified')}
-Secondary goals: {', '.join(health_goal.get('secondary', ['Not specified']))}
+User's primary health goal: {primary}
+Secondary goals: {secondary}
+
+""" + DIETARY_RESTRICTIONS_HEADING
+
+EXERCISE_BREAK_HEADER = """You are GG_Nourish, a health and nutrition assistant for gamers.
+Your task is to create a quick exercise break that can be done during gaming sessions.
+
+User's health goal: {primary}
+
+""" + DIETARY_RESTRICTIONS_HEADING
 
-**DIETARY RESTRICTIONS - CRITICALLY IMPORTANT:**
+EXERCISE_TIPS_HEADER = """You are GG_Nourish, a health and nutrition assistant for gamers.
+Your task is to provide exercise tips based on the user's health goal and exercise type.
+
+User's health goal: {primary}
+Exercise type: {exercise_type}
+
+""" + DIETARY_RESTRICTIONS_HEADING
+
+ALLERGY_TEMPLATE = """
+- FOOD ALLERGIES: {allergies}
+  ***WARNING: Never recommend foods containing these allergens - this is a safety issue***
 """
 
-        if allergies:
-            system_message += f"""
-- FOOD ALLERGIES: {', '.join(allergies)}
+DIET_TEMPLATE = """
+- DIETARY PREFERENCES: {diets}
+  ***Always respect these dietary preferences in ALL recommendations***
+"""
+
+# The fitness plan also covers supplements and nutrition advice
+PLAN_ALLERGY_TEMPLATE = """
+- FOOD ALLERGIES: {allergies}
   ***WARNING: Never recommend foods or supplements containing these allergens - this is a safety issue***
 """
-        else:
-            system_message += "- No known food allergies\n"
 
-        if diets:
-            system_message += f"""
-- DIETARY PREFERENCES: {', '.join(diets)}
+PLAN_DIET_TEMPLATE = """
+- DIETARY PREFERENCES: {diets}
   ***Always respect these dietary preferences in ALL nutrition recommendations***
 """
-        else:
-            system_message += "- No specific dietary preferences\n"
 
-        system_message += """
+NO_ALLERGIES_LINE = "- No known food allergies\n"
+NO_DIETS_LINE = "- No specific dietary preferences\n"
+
+FITNESS_PLAN_RULES_AND_SCHEMA = """
 Create a fitness plan that:
 1. Is realistic for gamers who may have limited time
 2. Includes exercises that can be done at home with minimal equipment
@@ -112,6 +131,195 @@ Respond in JSON format with:
   "progress_tracking": "How to track progress"
 }"""
 
+EXERCISE_BREAK_RULES_AND_SCHEMA = """
+Create a 5-10 minute exercise break that:
+1. Helps relieve tension from sitting
+2. Can be done right at the desk
+3. Focuses on problem areas for gamers (wrists, neck, back, eyes)
+4. Is energizing but not too intense
+5. NEVER suggests snacks or drinks that conflict with dietary restrictions
+
+Respond in JSON format with:
+{
+  "break_name": "Name of the exercise break",
+  "duration": "Total duration in minutes",
+  "exercises": [
+    {
+      "name": "Name of exercise",
+      "duration": "Duration in seconds",
+      "description": "Brief description of how to do the exercise",
+      "benefit": "Specific benefit for gamers"
+    }
+  ],
+  "healthy_snack_suggestion": "A quick healthy snack idea that strictly complies with any dietary restrictions",
+  "hydration_tip": "A tip for staying hydrated during gaming"
+}"""
+
+EXERCISE_TIPS_RULES_AND_SCHEMA = """
+Provide exercise tips that:
+1. Are specifically tailored to gamers
+2. Address the exercise type if specified
+3. Support the user's health goal
+4. Can be integrated into a gamer's lifestyle
+5. Include proper form guidance
+6. NEVER recommend protein sources or supplements that conflict with dietary restrictions
+7. ALWAYS be mindful of any dietary preferences when suggesting nutrition to support exercise
+
+Respond in JSON format with:
+{
+  "title": "Title for the exercise tips",
+  "primary_tips": [
+    "Primary tip 1",
+    "Primary tip 2"
+  ],
+  "form_guidance": "Guidance on proper form",
+  "gamer_specific_advice": "Advice specific to gamers",
+  "nutrition_tips": "Nutrition tips STRICTLY compliant with dietary restrictions",
+  "benefits": "Benefits of this exercise for the user's health goal"
+}"""
+
+def _render_restrictions(allergies, diets, allergy_template=ALLERGY_TEMPLATE, diet_template=DIET_TEMPLATE):
+    """Render the per-user allergy and diet lines of a system prompt"""
+    allergy_text = allergy_template.format(allergies=', '.join(allergies)) if allergies else NO_ALLERGIES_LINE
+    diet_text = diet_template.format(diets=', '.join(diets)) if diets else NO_DIETS_LINE
+    return allergy_text + diet_text
+
+
+def _parse_llm_json(text):
+    """Parse the JSON object out of a Mistral reply
+    
+    Raises ValueError unless the reply holds a complete object starting at its
+    first "{", so a truncated reply never passes for one of its nested values
+    """
+    match = _JSON_OBJECT_RE.search(text)
+    body = match.group(0) if match else text
+    try:
+        payload = json.loads(body)
+    except json.JSONDecodeError as e:
+        if json5 is None:
+            raise
+        try:
+            payload = json5.loads(body)
+        except ValueError:
+            raise e from None
+    if not isinstance(payload, dict):
+        raise ValueError(f"Expected a JSON object, got {type(payload).__name__}")
+    return payload
+
+
+def _holds_json_object(text):
+    """Check with the strict parser alone whether text already holds a complete JSON object"""
+    match = _JSON_OBJECT_RE.search(text)
+    if not match:
+        return False
+    try:
+        return isinstance(json.loads(match.group(0)), dict)
+    except json.JSONDecodeError:
+        return False
+
+
+class FitnessModule:
+    def __init__(self, mistral_client, user_data_manager):
+        """Initialize the fitness module with required dependencies"""
+        # The bot's shared synchronous MistralClient; calls run on worker threads and
+        # reuse its pooled connections, so never build a client per request
+        self.mistral_client = mistral_client
+        self.user_data_manager = user_data_manager
+        # Prompt -> in-flight Mistral call, so identical concurrent requests share one call
+        self._inflight = {}
+        # Prompt -> (timestamp, reply text) for plans, breaks and tips
+        self._plan_cache = {}
+        
+    def _cache_plan(self, key, reply):
+        """Cache a Mistral reply, evicting the oldest entry when full"""
+        self._plan_cache.pop(key, None)
+        if len(self._plan_cache) >= PLAN_CACHE_SIZE:
+            self._plan_cache.pop(next(iter(self._plan_cache)))
+        self._plan_cache[key] = (time.monotonic(), reply)
+        
+    def _stream_reply(self, messages):
+        """Stream a Mistral reply, stopping as soon as it holds a complete JSON payload
+        
+        Blocking; run on a worker thread. Anything Mistral would add after the
+        JSON is never waited for.
+        """
+        chunks = []
+        for chunk in self.mistral_client.chat_stream(model=MISTRAL_MODEL, messages=messages):
+            content = chunk.choices[0].delta.content
+            if not content:
+                continue
+            chunks.append(content)
+            # Only a piece ending in a closing brace can complete the object; the check is
+            # strict JSON only, as json5 is too slow to rerun on every partial reply
+            if content.rstrip()[-1:] == '}' and _holds_json_object("".join(chunks)):
+                break
+        return "".join(chunks)
+        
+    @staticmethod
+    def _extract_diet(user_data):
+        """Get the user's allergies and diets as tuples"""
+        dietary_preferences = user_data.get('dietary_preferences') or {}
+        allergies = tuple(dietary_preferences.get('allergies') or ())
+        diets = tuple(dietary_preferences.get('diets') or ())
+        return allergies, diets
+        
+    async def _chat(self, messages, cache=False):
+        """Get Mistral's reply text from a worker thread, joining an identical request that is already in flight"""
+        key = tuple((message["role"], message["content"]) for message in messages)
+        if cache:
+            # The prompt is built only from the goal, restrictions and exercise type,
+            # so users sharing those get the same plan without another Mistral call
+            cached = self._plan_cache.get(key)
+            if cached and time.monotonic() - cached[0] < PLAN_CACHE_TTL_SECONDS:
+                return cached[1]
+        call = self._inflight.get(key)
+        if call is None:
+            call = asyncio.ensure_future(asyncio.to_thread(self._stream_reply, messages))
+            self._inflight[key] = call
+            call.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # Shield the shared call so one caller being cancelled doesn't fail the others
+        reply = await asyncio.shield(call)
+        if cache:
+            # Don't keep a reply that can't be parsed, so asking again gets a fresh one
+            try:
+                _parse_llm_json(reply)
+            except ValueError:
+                return reply
+            self._cache_plan(key, reply)
+        return reply
+        
+    async def create_fitness_plan(self, user_id):
+        """Create a dynamic fitness plan aligned with the user's health goal"""
+        user_data = self.user_data_manager.get_user_data(user_id)
+        health_goal = user_data.get('health_goal', {})
+        
+        if not health_goal:
+            return {
+                "success": False,
+                "message": "I need to understand your health goal first. Can you tell me what your health goal is?"
+            }
+            
+        if not self.mistral_client:
+            return {
+                "success": False,
+                "message": "Sorry, I'm having trouble connecting to my AI brain right now."
+            }
+        
+        # Get dietary preferences if available
+        allergies, diets = self._extract_diet(user_data)
+                
+        # Log dietary restrictions for context
+        if allergies or diets:
+            logger.info(f"Including dietary restrictions in fitness plan for user {user_id}: {[*allergies, *diets]}")
+            
+        # Create system message for Mistral; only the goal and restrictions vary per user
+        system_message = FITNESS_PLAN_HEADER.format(
+            primary=health_goal.get('primary', 'Not specified'),
+            secondary=', '.join(health_goal.get('secondary', ['Not specified']))
+        )
+        system_message += _render_restrictions(allergies, diets, PLAN_ALLERGY_TEMPLATE, PLAN_DIET_TEMPLATE)
+        system_message += FITNESS_PLAN_RULES_AND_SCHEMA
+
         # Prepare messages for Mistral
         messages = [
             {"role": "system", "content": system_message},
@@ -120,19 +328,11 @@ Respond in JSON format with:
         
         try:
             # Call Mistral API
-            chat_response = self.mistral_client.chat(
-                model=MISTRAL_MODEL,
-                messages=messages
-            )
-            
-            # Extract the response
-            ai_message = chat_response.choices[0].message.content
+            ai_message = await self._chat(messages, cache=True)
             
             # Try to parse JSON from the response
             try:
-                # Clean up the response to extract valid JSON
-                ai_message = ai_message.replace("```json", "").replace("```", "").strip()
-                fitness_plan = json.loads(ai_message)
+                fitness_plan = _parse_llm_json(ai_message)
                 
                 # Save the fitness plan to user data
                 user_data['fitness_plan'] = {
@@ -142,10 +342,10 @@ Respond in JSON format with:
                     "goal_alignment": fitness_plan.get('goal_alignment'),
                     "created_at": datetime.now().isoformat()
                 }
-                self.user_data_manager.save_user_data()
+                self.user_data_manager.save_user_data(user_id, user_data)
                 
                 # Format the fitness plan with improved UI
-                formatted_message = f"""
+                parts = [f"""
 ```
 ╔═══════════════════════════════════════════╗
 ║     💪 YOUR PERSONALIZED FITNESS PLAN     ║
@@ -157,33 +357,33 @@ Respond in JSON format with:
 This plan is designed specifically for your **{health_goal.get('primary', '')}** goal.
 
 **WEEKLY SCHEDULE:**
-"""
+"""]
                 
                 for day in fitness_plan.get('weekly_schedule', []):
                     day_name = day.get('day', '')
                     day_focus = day.get('focus', '')
-                    formatted_message += f"\n**{day_name} - {day_focus}**\n"
+                    parts.append(f"\n**{day_name} - {day_focus}**\n")
                     
                     if day_focus.lower() == 'rest':
-                        formatted_message += "Rest day - Focus on recovery and light stretching.\n"
+                        parts.append("Rest day - Focus on recovery and light stretching.\n")
                     else:
-                        formatted_message += f"⏱️ Total time: {day.get('total_time', 'N/A')}\n\n"
+                        parts.append(f"⏱️ Total time: {day.get('total_time', 'N/A')}\n\n")
                         
                         for i, exercise in enumerate(day.get('exercises', []), 1):
                             exercise_name = exercise.get('name', '')
                             exercise_sets = exercise.get('sets', '')
                             exercise_reps = exercise.get('reps', '')
                             
-                            formatted_message += f"{i}. **{exercise_name}**: {exercise_sets} sets × {exercise_reps}\n"
-                            formatted_message += f"   _{exercise.get('description', '')}_\n"
+                            parts.append(f"{i}. **{exercise_name}**: {exercise_sets} sets × {exercise_reps}\n")
+                            parts.append(f"   _{exercise.get('description', '')}_\n")
                 
-                formatted_message += f"""
+                parts.append(f"""
 **EQUIPMENT NEEDED:**
-"""
+""")
                 for item in fitness_plan.get('equipment_needed', ['No special equipment needed']):
-                    formatted_message += f"• {item}\n"
+                    parts.append(f"• {item}\n")
                 
-                formatted_message += f"""
+                parts.append(f"""
 **HOW THIS SUPPORTS YOUR GOAL:**
 {fitness_plan.get('goal_alignment', 'N/A')}
 
@@ -200,15 +400,15 @@ This plan is designed specifically for your **{health_goal.get('primary', '')}**
 1️⃣ Start a quick workout break now
 2️⃣ Adjust this plan (easier/harder)
 3️⃣ Save this plan and continue gaming
-"""
+""")
                 
                 return {
                     "success": True,
-                    "message": formatted_message,
+                    "message": "".join(parts),
                     "fitness_plan": fitness_plan
                 }
                 
-            except json.JSONDecodeError as e:
+            except (json.JSONDecodeError, ValueError) as e:
                 logger.error(f"Error parsing Mistral response: {e}")
                 return {
                     "success": False,
@@ -237,67 +437,12 @@ This plan is designed specifically for your **{health_goal.get('primary', '')}**
             }
             
         # Get dietary preferences if available
-        dietary_preferences = user_data.get('dietary_preferences', {})
-        diet_restrictions = []
-        allergies = []
-        diets = []
-        
-        if dietary_preferences:
-            if 'allergies' in dietary_preferences:
-                allergies = dietary_preferences['allergies']
-                diet_restrictions.extend(allergies)
-            if 'diets' in dietary_preferences:
-                diets = dietary_preferences['diets']
-                diet_restrictions.extend(diets)
+        allergies, diets = self._extract_diet(user_data)
             
-        # Create system message for Mistral
-        system_message = f"""You are GG_Nourish, a health and nutrition assistant for gamers.
-Your task is to create a quick exercise break that can be done during gaming sessions.
-
-User's health goal: {health_goal.get('primary', 'Not specified')}
-
-**DIETARY RESTRICTIONS - CRITICALLY IMPORTANT:**
-"""
-
-        if allergies:
-            system_message += f"""
-- FOOD ALLERGIES: {', '.join(allergies)}
-  ***WARNING: Never recommend foods containing these allergens - this is a safety issue***
-"""
-        else:
-            system_message += "- No known food allergies\n"
-
-        if diets:
-            system_message += f"""
-- DIETARY PREFERENCES: {', '.join(diets)}
-  ***Always respect these dietary preferences in ALL recommendations***
-"""
-        else:
-            system_message += "- No specific dietary preferences\n"
-
-        system_message += """
-Create a 5-10 minute exercise break that:
-1. Helps relieve tension from sitting
-2. Can be done right at the desk
-3. Focuses on problem areas for gamers (wrists, neck, back, eyes)
-4. Is energizing but not too intense
-5. NEVER suggests snacks or drinks that conflict with dietary restrictions
-
-Respond in JSON format with:
-{
-  "break_name": "Name of the exercise break",
-  "duration": "Total duration in minutes",
-  "exercises": [
-    {
-      "name": "Name of exercise",
-      "duration": "Duration in seconds",
-      "description": "Brief description of how to do the exercise",
-      "benefit": "Specific benefit for gamers"
-    }
-  ],
-  "healthy_snack_suggestion": "A quick healthy snack idea that strictly complies with any dietary restrictions",
-  "hydration_tip": "A tip for staying hydrated during gaming"
-}"""
+        # Create system message for Mistral; only the goal and restrictions vary per user
+        system_message = EXERCISE_BREAK_HEADER.format(primary=health_goal.get('primary', 'Not specified'))
+        system_message += _render_restrictions(allergies, diets)
+        system_message += EXERCISE_BREAK_RULES_AND_SCHEMA
 
         # Prepare messages for Mistral
         messages = [
@@ -307,22 +452,14 @@ Respond in JSON format with:
         
         try:
             # Call Mistral API
-            chat_response = self.mistral_client.chat(
-                model=MISTRAL_MODEL,
-                messages=messages
-            )
-            
-            # Extract the response
-            ai_message = chat_response.choices[0].message.content
+            ai_message = await self._chat(messages, cache=True)
             
             # Try to parse JSON from the response
             try:
-                # Clean up the response to extract valid JSON
-                ai_message = ai_message.replace("```json", "").replace("```", "").strip()
-                exercise_break = json.loads(ai_message)
+                exercise_break = _parse_llm_json(ai_message)
                 
                 # Format the exercise break with improved UI
-                formatted_message = f"""
+                parts = [f"""
 ```
 ╔═══════════════════════════════════════════╗
 ║      ⏱️ {exercise_break.get('break_name', 'QUICK EXERCISE BREAK').upper()}      ║
@@ -334,7 +471,7 @@ Respond in JSON format with:
 Take a short break from gaming to refresh your body and mind!
 
 **EXERCISES:**
-"""
+"""]
                 
                 for i, exercise in enumerate(exercise_break.get('exercises', []), 1):
                     exercise_name = exercise.get('name', '')
@@ -342,11 +479,11 @@ Take a short break from gaming to refresh your body and mind!
                     exercise_description = exercise.get('description', '')
                     exercise_benefit = exercise.get('benefit', '')
                     
-                    formatted_message += f"{i}. **{exercise_name}** ({exercise_duration})\n"
-                    formatted_message += f"   {exercise_description}\n"
-                    formatted_message += f"   _Benefit: {exercise_benefit}_\n\n"
+                    parts.append(f"{i}. **{exercise_name}** ({exercise_duration})\n")
+                    parts.append(f"   {exercise_description}\n")
+                    parts.append(f"   _Benefit: {exercise_benefit}_\n\n")
                 
-                formatted_message += f"""
+                parts.append(f"""
 **HEALTHY SNACK SUGGESTION:**
 {exercise_break.get('healthy_snack_suggestion', 'N/A')}
 
@@ -354,25 +491,25 @@ Take a short break from gaming to refresh your body and mind!
 {exercise_break.get('hydration_tip', 'N/A')}
 
 **BENEFITS:**
-"""
+""")
                 
                 for benefit in exercise_break.get('benefits', []):
-                    formatted_message += f"• {benefit}\n"
+                    parts.append(f"• {benefit}\n")
                 
-                formatted_message += """
+                parts.append("""
 **WOULD YOU LIKE TO:**
 1️⃣ Start the guided workout with timer (opens in browser)
 2️⃣ See a different workout
 3️⃣ Skip this workout
-"""
+""")
                 
                 return {
                     "success": True,
-                    "message": formatted_message,
+                    "message": "".join(parts),
                     "exercise_break": exercise_break
                 }
                 
-            except json.JSONDecodeError as e:
+            except (json.JSONDecodeError, ValueError) as e:
                 logger.error(f"Error parsing Mistral response: {e}")
                 return {
                     "success": False,
@@ -400,71 +537,19 @@ Take a short break from gaming to refresh your body and mind!
             }
         
         # Get dietary preferences if available
-        dietary_preferences = user_data.get('dietary_preferences', {})
-        diet_restrictions = []
-        allergies = []
-        diets = []
-        
-        if dietary_preferences:
-            if 'allergies' in dietary_preferences:
-                allergies = dietary_preferences['allergies']
-                diet_restrictions.extend(allergies)
-            if 'diets' in dietary_preferences:
-                diets = dietary_preferences['diets']
-                diet_restrictions.extend(diets)
+        allergies, diets = self._extract_diet(user_data)
                 
         # Log dietary restrictions for context
-        if diet_restrictions:
-            logger.info(f"Including dietary restrictions in exercise tips for user {user_id}: {diet_restrictions}")
+        if allergies or diets:
+            logger.info(f"Including dietary restrictions in exercise tips for user {user_id}: {[*allergies, *diets]}")
             
-        # Create system message for Mistral
-        system_message = f"""You are GG_Nourish, a health and nutrition assistant for gamers.
-Your task is to provide exercise tips based on the user's health goal and exercise type.
-
-User's health goal: {health_goal.get('primary', 'Not specified')}
-Exercise type: {exercise_type or 'Not specified'}
-
-**DIETARY RESTRICTIONS - CRITICALLY IMPORTANT:**
-"""
-
-        if allergies:
-            system_message += f"""
-- FOOD ALLERGIES: {', '.join(allergies)}
-  ***WARNING: Never recommend foods containing these allergens - this is a safety issue***
-"""
-        else:
-            system_message += "- No known food allergies\n"
-
-        if diets:
-            system_message += f"""
-- DIETARY PREFERENCES: {', '.join(diets)}
-  ***Always respect these dietary preferences in ALL recommendations***
-"""
-        else:
-            system_message += "- No specific dietary preferences\n"
-
-        system_message += """
-Provide exercise tips that:
-1. Are specifically tailored to gamers
-2. Address the exercise type if specified
-3. Support the user's health goal
-4. Can be integrated into a gamer's lifestyle
-5. Include proper form guidance
-6. NEVER recommend protein sources or supplements that conflict with dietary restrictions
-7. ALWAYS be mindful of any dietary preferences when suggesting nutrition to support exercise
-
-Respond in JSON format with:
-{
-  "title": "Title for the exercise tips",
-  "primary_tips": [
-    "Primary tip 1",
-    "Primary tip 2"
-  ],
-  "form_guidance": "Guidance on proper form",
-  "gamer_specific_advice": "Advice specific to gamers",
-  "nutrition_tips": "Nutrition tips STRICTLY compliant with dietary restrictions",
-  "benefits": "Benefits of this exercise for the user's health goal"
-}"""
+        # Create system message for Mistral; only the goal, exercise type and restrictions vary per user
+        system_message = EXERCISE_TIPS_HEADER.format(
+            primary=health_goal.get('primary', 'Not specified'),
+            exercise_type=exercise_type or 'Not specified'
+        )
+        system_message += _render_restrictions(allergies, diets)
+        system_message += EXERCISE_TIPS_RULES_AND_SCHEMA
 
         # Prepare user message
         user_message = f"Give me tips for {exercise_type or 'exercises'} that align with my {health_goal.get('primary', '')} goal."
@@ -477,22 +562,14 @@ Respond in JSON format with:
         
         try:
             # Call Mistral API
-            chat_response = self.mistral_client.chat(
-                model=MISTRAL_MODEL,
-                messages=messages
-            )
-            
-            # Extract the response
-            ai_message = chat_response.choices[0].message.content
+            ai_message = await self._chat(messages, cache=True)
             
             # Try to parse JSON from the response
             try:
-                # Clean up the response to extract valid JSON
-                ai_message = ai_message.replace("```json", "").replace("```", "").strip()
-                exercise_tips = json.loads(ai_message)
+                exercise_tips = _parse_llm_json(ai_message)
                 
                 # Format the response with improved UI
-                formatted_message = f"""
+                parts = [f"""
 ```
 ╔══════════════════════════════════════════════════════════════════════════╗
 ║                    💪 {exercise_tips.get('title', 'EXERCISE TIPS')}                    ║
@@ -500,12 +577,12 @@ Respond in JSON format with:
 ```
 
 ## **Tips:**
-"""
+"""]
                 
                 for tip in exercise_tips.get('primary_tips', []):
-                    formatted_message += f"• {tip}\n"
+                    parts.append(f"• {tip}\n")
                 
-                formatted_message += f"""
+                parts.append(f"""
 ## **Proper Form:**
 {exercise_tips.get('form_guidance', 'N/A')}
 
@@ -519,15 +596,15 @@ Respond in JSON format with:
 {exercise_tips.get('benefits', 'N/A')}
 
 Remember to start slowly and listen to your body. Taking short exercise breaks during gaming sessions can greatly improve your overall health!
-"""
+""")
                 
                 return {
                     "success": True,
-                    "message": formatted_message,
+                    "message": "".join(parts),
                     "exercise_tips": exercise_tips
                 }
                 
-            except json.JSONDecodeError as e:
+            except (json.JSONDecodeError, ValueError) as e:
                 logger.error(f"Error parsing Mistral response: {e}")
                 return {
                     "success": False,
@@ -543,8 +620,39 @@ Remember to start slowly and listen to your body. Taking short exercise breaks d
                 "error": str(e)
             }
             
+    async def _record_gaming_status(self, user_id, gaming_status, game_name, channel_id=None):
+        """Track a detected gaming session start or end and describe it"""
+        if gaming_status == 'starting':
+            await self.user_data_manager.track_gaming_session(user_id, start=True, channel_id=channel_id)
+            return {
+                "status": "started",
+                "game": game_name
+            }
+        elif gaming_status == 'ending':
+            await self.user_data_manager.track_gaming_session(user_id, start=False)
+            return {
+                "status": "ended",
+                "game": game_name
+            }
+        return None
+        
     async def detect_gaming_session(self, user_id, message_content, channel_id=None):
         """Detect if a user is starting or ending a gaming session based on their message"""
+        # Clear-cut phrasings are settled locally, and messages with nothing
+        # gaming-related in them never reach Mistral. Negations and messages
+        # with both a start and an end cue are left to Mistral.
+        ambiguous = _NEGATION_RE.search(message_content) or (
+            _GAMING_START_CUE_RE.search(message_content) and _GAMING_END_CUE_RE.search(message_content)
+        )
+        if not ambiguous:
+            for gaming_status, pattern in (('starting', _GAMING_START_RE), ('ending', _GAMING_END_RE)):
+                if pattern.search(message_content):
+                    title = _GAME_TITLE_RE.search(message_content)
+                    game_name = title.group(0) if title else 'a game'
+                    return await self._record_gaming_status(user_id, gaming_status, game_name, channel_id)
+        if not _GAMING_HINT_RE.search(message_content):
+            return None
+            
         if not self.mistral_client:
             return None
             
@@ -582,37 +690,20 @@ If the message is unrelated to starting or ending a gaming session, set gaming_s
         
         try:
             # Call Mistral API
-            chat_response = self.mistral_client.chat(
-                model=MISTRAL_MODEL,
-                messages=messages
-            )
-            
-            # Extract the response
-            ai_message = chat_response.choices[0].message.content
+            ai_message = await self._chat(messages)
             
             # Try to parse JSON from the response
             try:
-                # Clean up the response to extract valid JSON
-                ai_message = ai_message.replace("```json", "").replace("```", "").strip()
-                gaming_analysis = json.loads(ai_message)
+                gaming_analysis = _parse_llm_json(ai_message)
                 
                 gaming_status = gaming_analysis.get('gaming_status', 'none')
                 confidence = float(gaming_analysis.get('confidence', 0))
                 
                 # Only consider if confidence is high enough
                 if confidence >= 0.7:
-                    if gaming_status == 'starting':
-                        await self.user_data_manager.track_gaming_session(user_id, start=True, channel_id=channel_id)
-                        return {
-                            "status": "started",
-                            "game": gaming_analysis.get('game_name', 'a game')
-                        }
-                    elif gaming_status == 'ending':
-                        await self.user_data_manager.track_gaming_session(user_id, start=False)
-                        return {
-                            "status": "ended",
-                            "game": gaming_analysis.get('game_name', 'a game')
-                        }
+                    return await self._record_gaming_status(
+                        user_id, gaming_status, gaming_analysis.get('game_name', 'a game'), channel_id
+                    )
                 
                 return None
                 
@@ -11,6 +11,11 @@ MISTRAL_MODEL = "mistral-medium"  # Using medium model for faster responses
 
 logger = logging.getLogger("food_module")
 
+# Dietary preference groups used to tailor the !diet confirmation
+ALLERGEN_PREFS = frozenset({"gluten-free", "nut-free", "dairy-free", "shellfish-free", "soy-free", "egg-free"})
+LIFESTYLE_PREFS = frozenset({"vegetarian", "vegan", "halal", "kosher"})
+HEALTH_PREFS = frozenset({"keto", "paleo", "low-carb", "low-sodium", "low-sugar", "low-fat"})
+
 class FoodModule:
     def __init__(self, mistral_client, user_data_manager):
         """Initialize the food module with required dependencies"""
@@ -26,6 +31,10 @@ class FoodModule:
         else:
             logger.warning("Uber Eats API initialized without API key - using mock data")
         
+    async def close(self):
+        """Close the Uber Eats API's HTTP session"""
+        await self.uber_eats_api.close()
+        
     async def determine_food_preference(self, user_id, message_content):
         """Determine if the user wants to order food or cook at home"""
         user_data = self.user_data_manager.get_user_data(user_id)
@@ -84,7 +93,7 @@ Respond in JSON format with:
                     "preference": preference,
                     "timestamp": datetime.now().isoformat()
                 }
-                self.user_data_manager.save_user_data()
+                self.user_data_manager.save_user_data(user_id, user_data)
                 
                 # Format the response based on preference
                 if preference == 'order':
@@ -607,8 +616,8 @@ Example: `!diet vegetarian, gluten-free, no shellfish`
     
     async def update_dietary_preferences(self, user_id, args):
         """Update the dietary preferences for a user"""
-        # Join args into a string and split by commas for individual preferences
-        preferences_text = " ".join(args)
+        # Commands pass the raw argument string; join a list of words into one
+        preferences_text = args if isinstance(args, str) else " ".join(args)
         new_preferences = [pref.strip() for pref in preferences_text.split(',')]
         
         # Filter out empty preferences
@@ -623,10 +632,20 @@ Example: `!diet vegetarian, gluten-free, no shellfish`
         # Update user data
         user_data = self.user_data_manager.get_user_data(user_id)
         user_data['dietary_restrictions'] = new_preferences
-        self.user_data_manager.save_user_data()
+        self.user_data_manager.save_user_data(user_id, user_data)
         
         logger.info(f"Updated dietary preferences for user {user_id}: {new_preferences}")
         
+        # Add a note for each group of preferences the user set
+        pref_set = {pref.lower() for pref in new_preferences}
+        notes = ""
+        if pref_set & ALLERGEN_PREFS:
+            notes += "\n**Safety Note:** I'll ensure all food recommendations strictly avoid these allergens for your safety.\n"
+        if pref_set & LIFESTYLE_PREFS:
+            notes += "\n**Lifestyle Note:** I'll respect your dietary choices in all recommendations.\n"
+        if pref_set & HEALTH_PREFS:
+            notes += "\n**Health Note:** I'll optimize recommendations to support your health goals.\n"
+        
         formatted_message = f"""
 ```
 ╔═══════════════════════════════════════════╗
@@ -638,7 +657,7 @@ I've updated your dietary restrictions to:
 • {" • ".join(new_preferences)}
 
 I'll make sure all food recommendations comply with these restrictions. Your health and safety are my top priority!
-"""
+{notes}"""
         
         return {
             "success": True,
@@ -1,25 +1,85 @@
 import json
 import os
+import threading
+import time
 from datetime import datetime, timedelta
 
+try:
+    # orjson serializes straight to bytes and is much faster when installed
+    import orjson
+    _json_loads = orjson.loads
+
+    def _json_dumps(data):
+        # OPT_NON_STR_KEYS stringifies int keys the way the stdlib json module does
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+except ImportError:
+    _json_loads = json.loads
+
+    def _json_dumps(data):
+        return json.dumps(data, indent=2).encode()
+
+# Days of per-day activity totals kept for each user
+DAILY_ACTIVITY_RETENTION_DAYS = 30
+
+def prune_daily_activity(daily_activity, now):
+    """Drop per-day activity totals older than DAILY_ACTIVITY_RETENTION_DAYS
+    
+    Keys are YYYY-MM-DD strings, which sort the same way as the dates they name
+    """
+    cutoff = (now - timedelta(days=DAILY_ACTIVITY_RETENTION_DAYS)).strftime('%Y-%m-%d')
+    for day in [day for day in daily_activity if day < cutoff]:
+        del daily_activity[day]
+
 class UserDataManager:
-    def __init__(self, data_file_path):
-        """Initialize the user data manager with the path to the data file"""
+    def __init__(self, data_file_path, write_back=False):
+        """Initialize the user data manager with the path to the data file
+        
+        With write_back enabled, saves only mark the data dirty and the owner
+        is responsible for calling flush() periodically and on shutdown
+        """
         self.data_file_path = data_file_path
+        self.write_back = write_back
+        self.dirty = False
+        # Bumped on every save; each user's entry records the version of the last
+        # save that named them, and saves that don't name a user count for everyone
+        self.version = 0
+        self._user_versions = {}
+        self._all_users_version = 0
+        # Snapshots may be written from a worker thread; the sequence keeps an
+        # older snapshot from overwriting a newer one that finished first
+        self._write_lock = threading.Lock()
+        self._snapshot_seq = 0
+        self._written_seq = 0
         self.user_data = self._load_user_data()
+        # user_id -> last activity as epoch seconds for users that may still be active;
+        # get_recently_active_users prunes stale entries so scans only see active users
+        self.last_activity_ts = self._index_last_activity()
         
     def _load_user_data(self):
         """Load user data from the data file"""
         if os.path.exists(self.data_file_path):
             try:
-                with open(self.data_file_path, 'r') as f:
-                    return json.load(f)
-            except json.JSONDecodeError:
+                with open(self.data_file_path, 'rb') as f:
+                    return _json_loads(f.read())
+            except ValueError:
                 print(f"Error loading user data from {self.data_file_path}. Creating new data file.")
                 return {}
         else:
             return {}
             
+    def _index_last_activity(self):
+        """Build the epoch-seconds index of each user's last activity"""
+        index = {}
+        for user_id, user_data in self.user_data.items():
+            last_activity = user_data.get('activity_data', {}).get('last_activity')
+            if not last_activity:
+                continue
+            try:
+                index[user_id] = datetime.fromisoformat(last_activity).timestamp()
+            except (TypeError, ValueError):
+                continue
+        return index
+            
     def save_user_data(self, user_id=None, user_data=None):
         """Save user data to the data file
         
@@ -29,8 +89,58 @@ class UserDataManager:
         if user_id and user_data:
             self.user_data[user_id] = user_data
             
-        with open(self.data_file_path, 'w') as f:
-            json.dump(self.user_data, f, indent=2)
+        self.version += 1
+        if user_id:
+            self._user_versions[user_id] = self.version
+        else:
+            self._all_users_version = self.version
+        self.dirty = True
+        if not self.write_back:
+            self.flush()
+            
+    def get_user_version(self, user_id):
+        """Get a version that changes whenever a save may have changed this user's data"""
+        return max(self._user_versions.get(user_id, 0), self._all_users_version)
+        
+    def flush(self):
+        """Write user data to the data file if it has changed since the last write"""
+        snapshot = self.take_snapshot()
+        if snapshot is not None:
+            self.write_snapshot(snapshot)
+            
+    def take_snapshot(self):
+        """Serialize user data if it has changed, returning None when there is nothing to write
+        
+        Must run on the thread that mutates user data; the result can then be
+        passed to write_snapshot from any thread
+        """
+        if not self.dirty:
+            return None
+            
+        # Clear the flag first so saves made while writing trigger another flush
+        self.dirty = False
+        self._snapshot_seq += 1
+        return self._snapshot_seq, _json_dumps(self.user_data)
+        
+    def write_snapshot(self, snapshot):
+        """Write a snapshot from take_snapshot to the data file"""
+        seq, payload = snapshot
+        tmp_path = f"{self.data_file_path}.tmp"
+        with self._write_lock:
+            if seq < self._written_seq:
+                return
+            try:
+                with open(tmp_path, 'wb') as f:
+                    f.write(payload)
+                    # Make the new contents durable before the rename publishes them,
+                    # otherwise a crash can leave an empty data file behind
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.data_file_path)
+            except Exception:
+                self.dirty = True
+                raise
+            self._written_seq = seq
             
     def get_user_data(self, user_id):
         """Get data for a specific user, creating a new entry if it doesn't exist"""
@@ -41,7 +151,7 @@ class UserDataManager:
                 "gaming_sessions": [],
                 "created_at": datetime.now().isoformat()
             }
-            self.save_user_data()
+            self.save_user_data(user_id)
         elif "chat_history" not in self.user_data[user_id]:
             # Ensure chat_history exists for existing users
             self.user_data[user_id]["chat_history"] = []
@@ -63,7 +173,7 @@ class UserDataManager:
         if len(user_data["chat_history"]) > 50:
             user_data["chat_history"] = user_data["chat_history"][-50:]
             
-        self.save_user_data()
+        self.save_user_data(user_id)
         
     def get_chat_history(self, user_id, limit=10):
         """Get the chat history for a user"""
@@ -92,7 +202,7 @@ class UserDataManager:
                 gaming_sessions[-1]["end_time"] = datetime.now().isoformat()
                 
         user_data["gaming_sessions"] = gaming_sessions
-        self.save_user_data()
+        self.save_user_data(user_id)
         
     def get_active_gaming_session(self, user_id):
         """Get the active gaming session for a user, if any"""
@@ -132,7 +242,7 @@ class UserDataManager:
         
         if active_session:
             active_session["last_activity_reminder"] = datetime.now().isoformat()
-            self.save_user_data()
+            self.save_user_data(user_id)
             
     def get_channel_for_active_session(self, user_id):
         """Get the channel ID for the active gaming session"""
@@ -147,6 +257,17 @@ class UserDataManager:
         """Get all user data"""
         return self.user_data
         
+    def get_recently_active_users(self, window_seconds):
+        """Get the ids of users active within the last window_seconds
+        
+        Users outside the window are dropped from the index until their next activity
+        """
+        cutoff = time.time() - window_seconds
+        stale = [user_id for user_id, ts in self.last_activity_ts.items() if ts < cutoff]
+        for user_id in stale:
+            del self.last_activity_ts[user_id]
+        return list(self.last_activity_ts)
+        
     def get_last_activity_time(self, user_id):
         """Get the last activity time for a user"""
         user_data = self.get_user_data(user_id)
@@ -161,26 +282,33 @@ class UserDataManager:
             
         return datetime.fromisoformat(last_activity)
         
-    def update_user_activity(self, user_id):
-        """Update the user's activity timestamp"""
+    def update_user_activity(self, user_id, timestamp=None, count=1):
+        """Update the user's activity timestamp
+        
+        count lets callers that buffer messages apply several at once
+        """
         user_data = self.get_user_data(user_id)
+        timestamp = timestamp or datetime.now()
         
         if 'activity_data' not in user_data:
             user_data['activity_data'] = {}
             
         # Update last activity time
-        user_data['activity_data']['last_activity'] = datetime.now().isoformat()
+        user_data['activity_data']['last_activity'] = timestamp.isoformat()
+        self.last_activity_ts[user_id] = timestamp.timestamp()
         
         # Update daily activity tracking
-        today = datetime.now().strftime('%Y-%m-%d')
+        today = timestamp.strftime('%Y-%m-%d')
         
         if 'daily_activity' not in user_data['activity_data']:
             user_data['activity_data']['daily_activity'] = {}
             
         if today not in user_data['activity_data']['daily_activity']:
+            # A new day is the only time old totals can expire
+            prune_daily_activity(user_data['activity_data']['daily_activity'], timestamp)
             user_data['activity_data']['daily_activity'][today] = 0
             
         # Increment activity time (in minutes)
-        user_data['activity_data']['daily_activity'][today] += 1
+        user_data['activity_data']['daily_activity'][today] += count
         
-        self.save_user_data()
+        self.save_user_data(user_id)